@@ -1,6 +1,17 @@
+import importlib
+
 from egamma_tnp.config import config
 
 from . import _version
 
 __version__ = _version.__version__
 __all__ = ("config",)
+
+# the subpackages are imported on first access, e.g. `egamma_tnp.triggers`
+_submodules = ("plot", "triggers", "utils")
+
+
+def __getattr__(name):
+    if name not in _submodules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return importlib.import_module(f"egamma_tnp.{name}")
@@ -3,38 +3,60 @@ import os
 
 
 class Config:
-    def __init__(self):
-        self.runtime_filename = os.path.join(
-            os.path.dirname(__file__), "runtime_config.json"
-        )
+    """The runtime configuration of the package, e.g. the binning of the histograms.
+
+    The configuration is held in memory and starts from `default_config.json`.
+    Nothing is written to disk unless `save` is called explicitly with a user path,
+    so importing the package works from read-only installations and parallel processes do not share a file.
+    If the `EGAMMA_TNP_CONFIG` environment variable is set, the configuration saved in that file is loaded on top of the defaults.
+
+    Parameters
+    ----------
+        filename : str, optional
+            A JSON file saved with `save` to load on top of the defaults.
+            The default is None, meaning the file of the `EGAMMA_TNP_CONFIG` environment variable if it is set.
+    """
+
+    def __init__(self, filename=None):
         self.default_filename = os.path.join(
             os.path.dirname(__file__), "default_config.json"
         )
+        self.runtime_config = self.load_config(self.default_filename)
 
-        with open(self.default_filename) as df:  # read from default config
-            default_data = json.load(df)
-        with open(self.runtime_filename, "w") as rf:  # write to runtime config
-            json.dump(default_data, rf, indent=4)
-
-        self.runtime_config = self.load_config(self.runtime_filename)
+        if filename is None:
+            filename = os.environ.get("EGAMMA_TNP_CONFIG")
+        if filename is not None:
+            self.load(filename)
 
     def load_config(self, filename):
         with open(filename) as f:
             return json.load(f)
 
-    def save_user_config(self):
-        with open(self.runtime_filename, "w") as f:
+    def load(self, filename):
+        """Update the configuration with the one saved in a JSON file."""
+        filename = os.path.expanduser(filename)
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(f"Configuration file {filename} does not exist.")
+        self.runtime_config.update(self.load_config(filename))
+
+    def save(self, filename):
+        """Save the configuration to a JSON file.
+
+        The file is written atomically, so that concurrent processes never read a partially written configuration.
+        """
+        filename = os.path.expanduser(filename)
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "w") as f:
             json.dump(self.runtime_config, f, indent=4)
+        os.replace(tmp_filename, filename)
 
     def set(self, key, value):
         # Only updates the user configuration
         self.runtime_config[key] = value
-        self.save_user_config()
 
     def reset(self, key):
         # Only updates the user configuration
         self.runtime_config[key] = self.load_config(self.default_filename)[key]
-        self.save_user_config()
 
     def get(self, key):
         # Retrieve from the user configuration
@@ -1,10 +1,6 @@
 import pathlib
 
-import mplhep as hep
 import numpy as np
-from matplotlib import pyplot as plt
-
-from egamma_tnp.utils import get_ratio_histogram
 
 
 def _save_and_close(fig, path, close_figure):
@@ -16,6 +12,8 @@ def _save_and_close(fig, path, close_figure):
             save it
         close_figure (bool): whether to close figure after saving
     """
+    from matplotlib import pyplot as plt
+
     if path is not None:
         path.parent.mkdir(parents=True, exist_ok=True)
         fig.savefig(path)
@@ -40,6 +38,8 @@ def plot_efficiency(passing_probes, all_probes, **kwargs):
         List[Hist1DArtists]
 
     """
+    from egamma_tnp.utils import get_ratio_histogram
+
     ratio_hist, yerr = get_ratio_histogram(passing_probes, all_probes)
 
     return ratio_hist.plot1d(
@@ -101,6 +101,11 @@ def plot_ratio(
         legend_kwargs : dict, optional
             Keyword arguments to pass to matplotlib.pyplot.legend.
     """
+    import mplhep as hep
+    from matplotlib import pyplot as plt
+
+    from egamma_tnp.utils import get_ratio_histogram
+
     eff1_default_kwargs = {"color": "k"}
     eff2_default_kwargs = {"color": "r"}
     effratio_default_kwargs = {
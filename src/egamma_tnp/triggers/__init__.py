@@ -1,19 +1,32 @@
-from egamma_tnp.triggers.doubleelept_caloidl_mw import DoubleElePt_CaloIdL_MW
-from egamma_tnp.triggers.elept1_elept2_caloidl_trackidl_isovl import (
-    ElePt1_ElePt2_CaloIdL_TrackIdL_IsoVL,
-)
-from egamma_tnp.triggers.elept_caloidvt_gsftrkidt import ElePt_CaloIdVT_GsfTrkIdT
-from egamma_tnp.triggers.elept_wptight_gsf import ElePt_WPTight_Gsf
-from egamma_tnp.triggers.ntuple_efficiency import TagNProbeFromNTuples
+import importlib
+
+# the triggers are imported on first access so that importing the package does not import coffea, dask and numba
+_modules = {
+    "DoubleElePt_CaloIdL_MW": "egamma_tnp.triggers.doubleelept_caloidl_mw",
+    "ElePt_WPTight_Gsf": "egamma_tnp.triggers.elept_wptight_gsf",
+    "ElePt_CaloIdVT_GsfTrkIdT": "egamma_tnp.triggers.elept_caloidvt_gsftrkidt",
+    "ElePt1_ElePt2_CaloIdL_TrackIdL_IsoVL": "egamma_tnp.triggers.elept1_elept2_caloidl_trackidl_isovl",
+    "MultiTrigger": "egamma_tnp.triggers.multitrigger",
+    "TagNProbeFromNTuples": "egamma_tnp.triggers.ntuple_efficiency",
+}
 
 __all__ = (
     "DoubleElePt_CaloIdL_MW",
     "ElePt_WPTight_Gsf",
     "ElePt_CaloIdVT_GsfTrkIdT",
     "ElePt1_ElePt2_CaloIdL_TrackIdL_IsoVL",
+    "MultiTrigger",
     "TagNProbeFromNTuples",
 )
 
 
+def __getattr__(name):
+    if name not in _modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_modules[name]), name)
+    globals()[name] = value
+    return value
+
+
 def dir():
     return __all__
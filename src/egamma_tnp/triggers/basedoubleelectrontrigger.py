@@ -1,9 +1,14 @@
 import os
 from functools import partial
 
+import dask_awkward as dak
 from coffea.dataset_tools import apply_to_fileset
 from coffea.nanoevents import NanoAODSchema
 
+from egamma_tnp.utils.dataset import prune_fileset
+from egamma_tnp.utils.execution import _run_local
+from egamma_tnp.utils.skim import _write_tnp_skims
+
 
 class BaseDoubleElectronTrigger:
     """BaseDoubleElectronTrigger class for HLT Trigger efficiency from NanoAOD.
@@ -39,6 +44,9 @@ class BaseDoubleElectronTrigger:
 
         if goldenjson is not None and not os.path.exists(goldenjson):
             raise FileNotFoundError(f"Golden JSON {goldenjson} does not exist.")
+        if goldenjson is not None:
+            # drop the steps without certified lumisections before any event is read
+            self.fileset = prune_fileset(fileset, goldenjson)
 
     def get_tnp_arrays(
         self,
@@ -90,27 +98,11 @@ class BaseDoubleElectronTrigger:
         if uproot_options is None:
             uproot_options = {}
 
-        perform_tnp_leg1 = self._tnpimpl_class(
-            pt=self.pt1,
-            filterbit=self.filterbit1,
-            avoid_ecal_transition_tags=self.avoid_ecal_transition_tags,
-            avoid_ecal_transition_probes=self.avoid_ecal_transition_probes,
-            goldenjson=self.goldenjson,
-            extra_filter=self._extra_filter,
-            extra_filter_args=self._extra_filter_args,
-        )
+        perform_tnp_leg1 = self._make_tnpimpl_on_leg("leg1")
         data_manipulation_leg1 = partial(
             self._make_tnp_arrays_on_leg, perform_tnp=perform_tnp_leg1, leg="leg1"
         )
-        perform_tnp_leg2 = self._tnpimpl_class(
-            pt=self.pt2,
-            filterbit=self.filterbit2,
-            avoid_ecal_transition_tags=self.avoid_ecal_transition_tags,
-            avoid_ecal_transition_probes=self.avoid_ecal_transition_probes,
-            goldenjson=self.goldenjson,
-            extra_filter=self._extra_filter,
-            extra_filter_args=self._extra_filter_args,
-        )
+        perform_tnp_leg2 = self._make_tnpimpl_on_leg("leg2")
         data_manipulation_leg2 = partial(
             self._make_tnp_arrays_on_leg, perform_tnp=perform_tnp_leg2, leg="leg2"
         )
@@ -171,9 +163,14 @@ class BaseDoubleElectronTrigger:
         eta_regions_pt=None,
         eta_regions_eta=None,
         eta_regions_phi=None,
+        pass_fail_axis=False,
+        eta_variable="eta",
         compute=False,
         scheduler=None,
         progress=False,
+        cache=None,
+        executor="dask",
+        max_workers=None,
     ):
         """Get the Pt and Eta histograms of the passing and all probes.
 
@@ -207,6 +204,14 @@ class BaseDoubleElectronTrigger:
                 where name is the name of the region and etamin and etamax are the absolute eta bounds.
                 The Phi histograms will be split into those eta regions.
                 The default is to use the entire |eta| < 2.5 region.
+            pass_fail_axis : bool, optional
+                Whether to fill a single histogram per variable with a `region` category axis and a boolean `passing` axis
+                instead of separate histograms of the passing and all probes for every eta region.
+                Wrap the computed histograms of a dataset in `egamma_tnp.utils.PassFailHistograms` to get the usual layout.
+                The default is False.
+            eta_variable : str, optional
+                The probe variable to use for the Eta histograms and the eta regions,
+                either "eta" or "etaSC" for the supercluster eta of the probes. The default is "eta".
             compute : bool, optional
                 Whether to return the computed hist.Hist histograms or the delayed hist.dask.Hist histograms.
                 The default is False.
@@ -216,6 +221,19 @@ class BaseDoubleElectronTrigger:
             progress : bool, optional
                 Whether to show a progress bar if `compute` is True. The default is False.
                 Only meaningful if compute is True and no distributed Client is used.
+            cache : egamma_tnp.utils.HistogramCache, optional
+                A cache to return the histograms from if they have already been computed with the same inputs
+                and to store them in otherwise. Only used if compute is True or the executor is not "dask". The default is None.
+                The fileset must be preprocessed with `coffea.dataset_tools.preprocess` so that its files are identified by their UUIDs.
+            executor : str, optional
+                Either "dask" to build the task graph of the histograms with dask-awkward,
+                "eager" to read the chunks of the fileset one after the other into eager awkward arrays
+                and return the computed histograms without building and optimizing a task graph,
+                or "processes" to do the same with the chunks spread over a local pool of processes.
+                The "eager" and "processes" executors are faster for small filesets and on a single machine.
+                They do not support file access reports and ignore `compute`, `scheduler` and `progress`. The default is "dask".
+            max_workers : int, optional
+                The number of processes of the "processes" executor. The default is None, meaning the number of CPUs.
 
         Returns
         -------
@@ -230,18 +248,32 @@ class BaseDoubleElectronTrigger:
                 For each dataset an awkward array that contains information about the file access is present.
 
         """
+        if executor not in ("dask", "eager", "processes"):
+            raise ValueError(
+                f"Executor must be 'dask', 'eager' or 'processes', not {executor!r}."
+            )
         if uproot_options is None:
             uproot_options = {}
+        if (compute or executor != "dask") and cache is not None:
+            cache_key = cache.key(
+                self,
+                method="get_tnp_histograms",
+                leg=leg,
+                schemaclass=schemaclass,
+                uproot_options=uproot_options,
+                plateau_cut1=plateau_cut1,
+                plateau_cut2=plateau_cut2,
+                eta_regions_pt=eta_regions_pt,
+                eta_regions_eta=eta_regions_eta,
+                eta_regions_phi=eta_regions_phi,
+                pass_fail_axis=pass_fail_axis,
+                eta_variable=eta_variable,
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-        perform_tnp_leg1 = self._tnpimpl_class(
-            pt=self.pt1,
-            filterbit=self.filterbit1,
-            avoid_ecal_transition_tags=self.avoid_ecal_transition_tags,
-            avoid_ecal_transition_probes=self.avoid_ecal_transition_probes,
-            goldenjson=self.goldenjson,
-            extra_filter=self._extra_filter,
-            extra_filter_args=self._extra_filter_args,
-        )
+        perform_tnp_leg1 = self._make_tnpimpl_on_leg("leg1")
         data_manipulation_leg1 = partial(
             self._make_tnp_histograms_on_leg,
             perform_tnp=perform_tnp_leg1,
@@ -250,16 +282,10 @@ class BaseDoubleElectronTrigger:
             eta_regions_pt=eta_regions_pt,
             eta_regions_eta=eta_regions_eta,
             eta_regions_phi=eta_regions_phi,
+            pass_fail_axis=pass_fail_axis,
+            eta_variable=eta_variable,
         )
-        perform_tnp_leg2 = self._tnpimpl_class(
-            pt=self.pt2,
-            filterbit=self.filterbit2,
-            avoid_ecal_transition_tags=self.avoid_ecal_transition_tags,
-            avoid_ecal_transition_probes=self.avoid_ecal_transition_probes,
-            goldenjson=self.goldenjson,
-            extra_filter=self._extra_filter,
-            extra_filter_args=self._extra_filter_args,
-        )
+        perform_tnp_leg2 = self._make_tnpimpl_on_leg("leg2")
         data_manipulation_leg2 = partial(
             self._make_tnp_histograms_on_leg,
             perform_tnp=perform_tnp_leg2,
@@ -268,6 +294,8 @@ class BaseDoubleElectronTrigger:
             eta_regions_pt=eta_regions_pt,
             eta_regions_eta=eta_regions_eta,
             eta_regions_phi=eta_regions_phi,
+            pass_fail_axis=pass_fail_axis,
+            eta_variable=eta_variable,
         )
         data_manipulation_both = partial(
             self._make_tnp_histograms_on_both_legs,
@@ -278,29 +306,37 @@ class BaseDoubleElectronTrigger:
             eta_regions_pt=eta_regions_pt,
             eta_regions_eta=eta_regions_eta,
             eta_regions_phi=eta_regions_phi,
+            pass_fail_axis=pass_fail_axis,
+            eta_variable=eta_variable,
         )
 
-        if leg == "first":
-            to_compute = apply_to_fileset(
-                data_manipulation=data_manipulation_leg1,
-                fileset=self.fileset,
-                schemaclass=schemaclass,
-                uproot_options=uproot_options,
-            )
-        elif leg == "second":
-            to_compute = apply_to_fileset(
-                data_manipulation=data_manipulation_leg2,
-                fileset=self.fileset,
-                schemaclass=schemaclass,
-                uproot_options=uproot_options,
-            )
-        elif leg == "both":
-            to_compute = apply_to_fileset(
-                data_manipulation=data_manipulation_both,
-                fileset=self.fileset,
-                schemaclass=schemaclass,
-                uproot_options=uproot_options,
+        data_manipulation = {
+            "first": data_manipulation_leg1,
+            "second": data_manipulation_leg2,
+            "both": data_manipulation_both,
+        }.get(leg)
+        if data_manipulation is None:
+            raise ValueError(f"leg must be 'first', 'second' or 'both', not {leg!r}.")
+
+        if executor != "dask":
+            histograms = _run_local(
+                data_manipulation,
+                self.fileset,
+                schemaclass,
+                uproot_options,
+                executor=executor,
+                max_workers=max_workers,
             )
+            if cache is not None:
+                cache.put(cache_key, histograms)
+            return histograms
+
+        to_compute = apply_to_fileset(
+            data_manipulation=data_manipulation,
+            fileset=self.fileset,
+            schemaclass=schemaclass,
+            uproot_options=uproot_options,
+        )
 
         if compute:
             import dask
@@ -315,18 +351,126 @@ class BaseDoubleElectronTrigger:
             if progress:
                 pbar.unregister()
 
+            if cache is not None:
+                cache.put(cache_key, computed[0])
+
             return computed[0]
 
         return to_compute
 
+    def write_tnp_skim(
+        self,
+        path,
+        schemaclass=NanoAODSchema,
+        uproot_options=None,
+        compute=True,
+        scheduler=None,
+        progress=False,
+    ):
+        """Write the flattened probes of every dataset to Parquet under `path/dataset/name/leg`.
+
+        The probes are written with their `pt`, `eta`, `phi`, `etaSC`, the `mass` of the tag and probe pair,
+        the `run`, `luminosityBlock` and `event` of the event and the `passing` flag of the leg.
+        Use `egamma_tnp.utils.get_tnp_histograms_from_skim` to fill the histograms again from the skims
+        with any binning or eta regions without reading the NanoAOD again.
+
+        Parameters
+        ----------
+            path : str
+                The directory to write the skims to.
+            schemaclass: BaseSchema, default NanoAODSchema
+                The nanoevents schema to interpret the input dataset with.
+            uproot_options : dict, optional
+                Options to pass to uproot. Pass at least {"allow_read_errors_with_report": True} to turn on file access reports.
+            compute : bool, optional
+                Whether to write the skims or return the delayed writes.
+                The default is True.
+            scheduler : str, optional
+                The dask scheduler to use. The default is None.
+                Only used if compute is True.
+            progress : bool, optional
+                Whether to show a progress bar if `compute` is True. The default is False.
+                Only meaningful if compute is True and no distributed Client is used.
+
+        Returns
+        -------
+            If `compute` is True, the computed report if `allow_read_errors_with_report` is True, otherwise None.
+            If `compute` is False, the delayed writes, together with the delayed report if `allow_read_errors_with_report` is True.
+        """
+        if uproot_options is None:
+            uproot_options = {}
+
+        data_manipulation = partial(
+            self._make_tnp_skim,
+            perform_tnp_leg1=self._make_tnpimpl_on_leg("leg1"),
+            perform_tnp_leg2=self._make_tnpimpl_on_leg("leg2"),
+        )
+
+        to_compute = apply_to_fileset(
+            data_manipulation=data_manipulation,
+            fileset=self.fileset,
+            schemaclass=schemaclass,
+            uproot_options=uproot_options,
+        )
+        return _write_tnp_skims(to_compute, path, compute, scheduler, progress)
+
+    @property
+    def required_columns(self):
+        """The NanoAOD branches that are read to compute the efficiencies of both legs, without the ones used by `extra_filter`.
+
+        Use `egamma_tnp.utils.check_columns` to check that the task graph does not read anything else.
+        """
+        return self._make_tnpimpl_on_leg("leg1").required_columns(
+            [(self.pt1, self.filterbit1), (self.pt2, self.filterbit2)]
+        )
+
+    def _make_tnpimpl_on_leg(self, leg):
+        if leg == "leg1":
+            pt, filterbit = self.pt1, self.filterbit1
+        elif leg == "leg2":
+            pt, filterbit = self.pt2, self.filterbit2
+        else:
+            raise ValueError(f"leg must be 'leg1' or 'leg2', not {leg}")
+
+        return self._tnpimpl_class(
+            pt=pt,
+            filterbit=filterbit,
+            avoid_ecal_transition_tags=self.avoid_ecal_transition_tags,
+            avoid_ecal_transition_probes=self.avoid_ecal_transition_probes,
+            goldenjson=self.goldenjson,
+            extra_filter=self._extra_filter,
+            extra_filter_args=self._extra_filter_args,
+        )
+
+    def _make_tnp_skim(self, events, perform_tnp_leg1, perform_tnp_leg2):
+        return {
+            self.name: self._find_probes_on_both_legs(
+                events, perform_tnp_leg1, perform_tnp_leg2, skim=True
+            )
+        }
+
     def _make_tnp_arrays_on_leg(self, events, perform_tnp, leg):
         return {leg: perform_tnp(events)}
 
     def _make_tnp_arrays_on_both_legs(self, events, perform_tnp_leg1, perform_tnp_leg2):
-        return {
-            "leg1": perform_tnp_leg1(events),
-            "leg2": perform_tnp_leg2(events),
-        }
+        return self._find_probes_on_both_legs(
+            events, perform_tnp_leg1, perform_tnp_leg2
+        )
+
+    def _find_probes_on_both_legs(
+        self, events, perform_tnp_leg1, perform_tnp_leg2, flag_passing=False, skim=False
+    ):
+        # The two legs only differ in the Pt cut and the filter bit of the probes.
+        # The event selection, the Z candidates and the tags are therefore computed only once.
+        good_events, zcands = perform_tnp_leg1.find_zcands(events)
+        legs = [
+            (perform_tnp_leg1.pt, perform_tnp_leg1.filterbit),
+            (perform_tnp_leg2.pt, perform_tnp_leg2.filterbit),
+        ]
+        probes_leg1, probes_leg2 = perform_tnp_leg1.find_all_probes_on_legs(
+            good_events, zcands, legs, flag_passing=flag_passing, skim=skim
+        )
+        return {"leg1": probes_leg1, "leg2": probes_leg2}
 
     def _make_tnp_histograms_on_leg_core(
         self,
@@ -336,8 +480,23 @@ class BaseDoubleElectronTrigger:
         eta_regions_pt,
         eta_regions_eta,
         eta_regions_phi,
+        pass_fail_axis,
+        eta_variable,
     ):
-        from egamma_tnp.utils import fill_tnp_histograms
+        from egamma_tnp.utils import fill_pass_fail_histograms, fill_tnp_histograms
+
+        delayed = isinstance(events, dak.Array)
+
+        if pass_fail_axis:
+            return fill_pass_fail_histograms(
+                perform_tnp(events, flag_passing=True),
+                plateau_cut=plateau_cut,
+                eta_regions_pt=eta_regions_pt,
+                eta_regions_eta=eta_regions_eta,
+                eta_regions_phi=eta_regions_phi,
+                eta_variable=eta_variable,
+                delayed=delayed,
+            )
 
         passing_probes, all_probes = perform_tnp(events)
         return fill_tnp_histograms(
@@ -347,6 +506,8 @@ class BaseDoubleElectronTrigger:
             eta_regions_pt=eta_regions_pt,
             eta_regions_eta=eta_regions_eta,
             eta_regions_phi=eta_regions_phi,
+            eta_variable=eta_variable,
+            delayed=delayed,
         )
 
     def _make_tnp_histograms_on_leg(
@@ -358,6 +519,8 @@ class BaseDoubleElectronTrigger:
         eta_regions_pt,
         eta_regions_eta,
         eta_regions_phi,
+        pass_fail_axis,
+        eta_variable,
     ):
         return {
             leg: self._make_tnp_histograms_on_leg_core(
@@ -367,6 +530,8 @@ class BaseDoubleElectronTrigger:
                 eta_regions_pt,
                 eta_regions_eta,
                 eta_regions_phi,
+                pass_fail_axis,
+                eta_variable,
             )
         }
 
@@ -380,22 +545,40 @@ class BaseDoubleElectronTrigger:
         eta_regions_pt,
         eta_regions_eta,
         eta_regions_phi,
+        pass_fail_axis,
+        eta_variable,
     ):
+        from egamma_tnp.utils import fill_pass_fail_histograms, fill_tnp_histograms
+
+        delayed = isinstance(events, dak.Array)
+
+        probes = self._find_probes_on_both_legs(
+            events, perform_tnp_leg1, perform_tnp_leg2, flag_passing=pass_fail_axis
+        )
+        plateau_cuts = {"leg1": plateau_cut1, "leg2": plateau_cut2}
+        if pass_fail_axis:
+            return {
+                leg: fill_pass_fail_histograms(
+                    flagged_probes,
+                    plateau_cut=plateau_cuts[leg],
+                    eta_regions_pt=eta_regions_pt,
+                    eta_regions_eta=eta_regions_eta,
+                    eta_regions_phi=eta_regions_phi,
+                    eta_variable=eta_variable,
+                    delayed=delayed,
+                )
+                for leg, flagged_probes in probes.items()
+            }
         return {
-            "leg1": self._make_tnp_histograms_on_leg_core(
-                events,
-                perform_tnp_leg1,
-                plateau_cut1,
-                eta_regions_pt,
-                eta_regions_eta,
-                eta_regions_phi,
-            ),
-            "leg2": self._make_tnp_histograms_on_leg_core(
-                events,
-                perform_tnp_leg2,
-                plateau_cut2,
-                eta_regions_pt,
-                eta_regions_eta,
-                eta_regions_phi,
-            ),
+            leg: fill_tnp_histograms(
+                passing_probes,
+                all_probes,
+                plateau_cut=plateau_cuts[leg],
+                eta_regions_pt=eta_regions_pt,
+                eta_regions_eta=eta_regions_eta,
+                eta_regions_phi=eta_regions_phi,
+                eta_variable=eta_variable,
+                delayed=delayed,
+            )
+            for leg, (passing_probes, all_probes) in probes.items()
         }
@@ -1,9 +1,14 @@
 import os
 from functools import partial
 
+import dask_awkward as dak
 from coffea.dataset_tools import apply_to_fileset
 from coffea.nanoevents import NanoAODSchema
 
+from egamma_tnp.utils.dataset import prune_fileset
+from egamma_tnp.utils.execution import _run_local
+from egamma_tnp.utils.skim import _write_tnp_skims
+
 
 class BaseSingleElectronTrigger:
     """BaseSingleElectronTrigger class for HLT Trigger efficiency from NanoAOD.
@@ -35,6 +40,9 @@ class BaseSingleElectronTrigger:
 
         if goldenjson is not None and not os.path.exists(goldenjson):
             raise FileNotFoundError(f"Golden JSON {goldenjson} does not exist.")
+        if goldenjson is not None:
+            # drop the steps without certified lumisections before any event is read
+            self.fileset = prune_fileset(fileset, goldenjson)
 
     def get_tnp_arrays(
         self,
@@ -79,15 +87,7 @@ class BaseSingleElectronTrigger:
         if uproot_options is None:
             uproot_options = {}
 
-        perform_tnp = self._tnpimpl_class(
-            pt=self.pt,
-            filterbit=self.filterbit,
-            avoid_ecal_transition_tags=self.avoid_ecal_transition_tags,
-            avoid_ecal_transition_probes=self.avoid_ecal_transition_probes,
-            goldenjson=self.goldenjson,
-            extra_filter=self._extra_filter,
-            extra_filter_args=self._extra_filter_args,
-        )
+        perform_tnp = self._make_tnpimpl()
         data_manipulation = perform_tnp
 
         to_compute = apply_to_fileset(
@@ -121,9 +121,14 @@ class BaseSingleElectronTrigger:
         eta_regions_pt=None,
         eta_regions_eta=None,
         eta_regions_phi=None,
+        pass_fail_axis=False,
+        eta_variable="eta",
         compute=False,
         scheduler=None,
         progress=False,
+        cache=None,
+        executor="dask",
+        max_workers=None,
     ):
         """Get the Pt and Eta histograms of the passing and all probes.
 
@@ -151,6 +156,14 @@ class BaseSingleElectronTrigger:
                 where name is the name of the region and etamin and etamax are the absolute eta bounds.
                 The Phi histograms will be split into those eta regions.
                 The default is to use the entire |eta| < 2.5 region.
+            pass_fail_axis : bool, optional
+                Whether to fill a single histogram per variable with a `region` category axis and a boolean `passing` axis
+                instead of separate histograms of the passing and all probes for every eta region.
+                Wrap the computed histograms of a dataset in `egamma_tnp.utils.PassFailHistograms` to get the usual layout.
+                The default is False.
+            eta_variable : str, optional
+                The probe variable to use for the Eta histograms and the eta regions,
+                either "eta" or "etaSC" for the supercluster eta of the probes. The default is "eta".
             compute : bool, optional
                 Whether to return the computed hist.Hist histograms or the delayed hist.dask.Hist histograms.
                 The default is False.
@@ -160,6 +173,19 @@ class BaseSingleElectronTrigger:
             progress : bool, optional
                 Whether to show a progress bar if `compute` is True. The default is False.
                 Only meaningful if compute is True and no distributed Client is used.
+            cache : egamma_tnp.utils.HistogramCache, optional
+                A cache to return the histograms from if they have already been computed with the same inputs
+                and to store them in otherwise. Only used if compute is True or the executor is not "dask". The default is None.
+                The fileset must be preprocessed with `coffea.dataset_tools.preprocess` so that its files are identified by their UUIDs.
+            executor : str, optional
+                Either "dask" to build the task graph of the histograms with dask-awkward,
+                "eager" to read the chunks of the fileset one after the other into eager awkward arrays
+                and return the computed histograms without building and optimizing a task graph,
+                or "processes" to do the same with the chunks spread over a local pool of processes.
+                The "eager" and "processes" executors are faster for small filesets and on a single machine.
+                They do not support file access reports and ignore `compute`, `scheduler` and `progress`. The default is "dask".
+            max_workers : int, optional
+                The number of processes of the "processes" executor. The default is None, meaning the number of CPUs.
 
         Returns
         -------
@@ -172,18 +198,30 @@ class BaseSingleElectronTrigger:
             report: dict of awkward arrays of the same form as fileset.
                 For each dataset an awkward array that contains information about the file access is present.
         """
+        if executor not in ("dask", "eager", "processes"):
+            raise ValueError(
+                f"Executor must be 'dask', 'eager' or 'processes', not {executor!r}."
+            )
         if uproot_options is None:
             uproot_options = {}
+        if (compute or executor != "dask") and cache is not None:
+            cache_key = cache.key(
+                self,
+                method="get_tnp_histograms",
+                schemaclass=schemaclass,
+                uproot_options=uproot_options,
+                plateau_cut=plateau_cut,
+                eta_regions_pt=eta_regions_pt,
+                eta_regions_eta=eta_regions_eta,
+                eta_regions_phi=eta_regions_phi,
+                pass_fail_axis=pass_fail_axis,
+                eta_variable=eta_variable,
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-        perform_tnp = self._tnpimpl_class(
-            pt=self.pt,
-            filterbit=self.filterbit,
-            avoid_ecal_transition_tags=self.avoid_ecal_transition_tags,
-            avoid_ecal_transition_probes=self.avoid_ecal_transition_probes,
-            goldenjson=self.goldenjson,
-            extra_filter=self._extra_filter,
-            extra_filter_args=self._extra_filter_args,
-        )
+        perform_tnp = self._make_tnpimpl()
         data_manipulation = partial(
             self._make_tnp_histograms,
             perform_tnp=perform_tnp,
@@ -191,8 +229,23 @@ class BaseSingleElectronTrigger:
             eta_regions_pt=eta_regions_pt,
             eta_regions_eta=eta_regions_eta,
             eta_regions_phi=eta_regions_phi,
+            pass_fail_axis=pass_fail_axis,
+            eta_variable=eta_variable,
         )
 
+        if executor != "dask":
+            histograms = _run_local(
+                data_manipulation,
+                self.fileset,
+                schemaclass,
+                uproot_options,
+                executor=executor,
+                max_workers=max_workers,
+            )
+            if cache is not None:
+                cache.put(cache_key, histograms)
+            return histograms
+
         to_compute = apply_to_fileset(
             data_manipulation=data_manipulation,
             fileset=self.fileset,
@@ -212,10 +265,89 @@ class BaseSingleElectronTrigger:
             if progress:
                 pbar.unregister()
 
+            if cache is not None:
+                cache.put(cache_key, computed[0])
+
             return computed[0]
 
         return to_compute
 
+    def write_tnp_skim(
+        self,
+        path,
+        schemaclass=NanoAODSchema,
+        uproot_options=None,
+        compute=True,
+        scheduler=None,
+        progress=False,
+    ):
+        """Write the flattened probes of every dataset to Parquet under `path/dataset/name`.
+
+        The probes are written with their `pt`, `eta`, `phi`, `etaSC`, the `mass` of the tag and probe pair,
+        the `run`, `luminosityBlock` and `event` of the event and the `passing` flag of the trigger.
+        Use `egamma_tnp.utils.get_tnp_histograms_from_skim` to fill the histograms again from the skims
+        with any binning or eta regions without reading the NanoAOD again.
+
+        Parameters
+        ----------
+            path : str
+                The directory to write the skims to.
+            schemaclass: BaseSchema, default NanoAODSchema
+                The nanoevents schema to interpret the input dataset with.
+            uproot_options : dict, optional
+                Options to pass to uproot. Pass at least {"allow_read_errors_with_report": True} to turn on file access reports.
+            compute : bool, optional
+                Whether to write the skims or return the delayed writes.
+                The default is True.
+            scheduler : str, optional
+                The dask scheduler to use. The default is None.
+                Only used if compute is True.
+            progress : bool, optional
+                Whether to show a progress bar if `compute` is True. The default is False.
+                Only meaningful if compute is True and no distributed Client is used.
+
+        Returns
+        -------
+            If `compute` is True, the computed report if `allow_read_errors_with_report` is True, otherwise None.
+            If `compute` is False, the delayed writes, together with the delayed report if `allow_read_errors_with_report` is True.
+        """
+        if uproot_options is None:
+            uproot_options = {}
+
+        data_manipulation = partial(
+            self._make_tnp_skim, perform_tnp=self._make_tnpimpl()
+        )
+
+        to_compute = apply_to_fileset(
+            data_manipulation=data_manipulation,
+            fileset=self.fileset,
+            schemaclass=schemaclass,
+            uproot_options=uproot_options,
+        )
+        return _write_tnp_skims(to_compute, path, compute, scheduler, progress)
+
+    @property
+    def required_columns(self):
+        """The NanoAOD branches that are read to compute the efficiencies, without the ones used by `extra_filter`.
+
+        Use `egamma_tnp.utils.check_columns` to check that the task graph does not read anything else.
+        """
+        return self._make_tnpimpl().required_columns()
+
+    def _make_tnpimpl(self):
+        return self._tnpimpl_class(
+            pt=self.pt,
+            filterbit=self.filterbit,
+            avoid_ecal_transition_tags=self.avoid_ecal_transition_tags,
+            avoid_ecal_transition_probes=self.avoid_ecal_transition_probes,
+            goldenjson=self.goldenjson,
+            extra_filter=self._extra_filter,
+            extra_filter_args=self._extra_filter_args,
+        )
+
+    def _make_tnp_skim(self, events, perform_tnp):
+        return {self.name: perform_tnp(events, skim=True)}
+
     def _make_tnp_histograms(
         self,
         events,
@@ -224,8 +356,23 @@ class BaseSingleElectronTrigger:
         eta_regions_pt,
         eta_regions_eta,
         eta_regions_phi,
+        pass_fail_axis,
+        eta_variable,
     ):
-        from egamma_tnp.utils import fill_tnp_histograms
+        from egamma_tnp.utils import fill_pass_fail_histograms, fill_tnp_histograms
+
+        delayed = isinstance(events, dak.Array)
+
+        if pass_fail_axis:
+            return fill_pass_fail_histograms(
+                perform_tnp(events, flag_passing=True),
+                plateau_cut=plateau_cut,
+                eta_regions_pt=eta_regions_pt,
+                eta_regions_eta=eta_regions_eta,
+                eta_regions_phi=eta_regions_phi,
+                eta_variable=eta_variable,
+                delayed=delayed,
+            )
 
         passing_probes, all_probes = perform_tnp(events)
         return fill_tnp_histograms(
@@ -235,4 +382,6 @@ class BaseSingleElectronTrigger:
             eta_regions_pt=eta_regions_pt,
             eta_regions_eta=eta_regions_eta,
             eta_regions_phi=eta_regions_phi,
+            eta_variable=eta_variable,
+            delayed=delayed,
         )
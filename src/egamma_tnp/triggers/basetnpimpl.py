@@ -0,0 +1,408 @@
+import awkward as ak
+import dask_awkward as dak
+
+from egamma_tnp.utils.lumimask import load_lumimask
+from egamma_tnp.utils.misc import trigger_match_bits_SC
+
+
+def _array_library(array):
+    # the implementations run on delayed dask-awkward arrays as well as on eager awkward arrays
+    return dak if isinstance(array, dak.Array) else ak
+
+
+def select_tag_candidates(pass_hlt, electrons):
+    """The event selection of the NanoAOD triggers before any lumi masking or trigger matching.
+
+    It is shared by `BaseTnPImpl.filter_events` and the prefiltering of the filesets so that both always select the same events.
+
+    Parameters
+    ----------
+        pass_hlt : awkward.Array or dask_awkward.Array
+            Whether each event fired HLT_Ele30_WPTight_Gsf.
+        electrons : awkward.Array or dask_awkward.Array
+            The electrons of each event with at least the `cutBased` and `eta` fields.
+
+    Returns
+    -------
+        pass_selection : awkward.Array or dask_awkward.Array
+            Whether each electron passes the selection.
+        good : awkward.Array or dask_awkward.Array
+            Whether each event has exactly two electrons that both pass the selection.
+    """
+    lib = _array_library(electrons)
+    two_electrons = lib.num(electrons) == 2
+    pass_tight_id = electrons.cutBased == 4
+    pass_eta = abs(electrons.eta) <= 2.5
+    pass_selection = pass_hlt & two_electrons & pass_eta & pass_tight_id
+    good = lib.sum(pass_selection, axis=1) == 2
+    return pass_selection, good
+
+
+class BaseTnPImpl:
+    """BaseTnPImpl class for the Tag and Probe implementations of HLT triggers from NanoAOD.
+
+    This class holds the per-chunk selection that is common to all the triggers.
+    Subclasses only need to define the Pt cuts of the tags and probes and the HLT path that the passing probes must have fired.
+    """
+
+    tag_pt_cut = 30
+    # the `(filterbit, pt)` trigger object filter that the tags are matched to, i.e. the last filter of HLT_Ele30_WPTight_Gsf
+    tag_filter = (1, 30)
+    electron_columns = (
+        "pt",
+        "eta",
+        "phi",
+        "mass",
+        "charge",
+        "cutBased",
+        "deltaEtaSC",
+    )
+    trigobj_columns = ("pt", "eta", "phi", "id", "filterBits")
+
+    def __init__(
+        self,
+        pt,
+        filterbit,
+        avoid_ecal_transition_tags,
+        avoid_ecal_transition_probes,
+        goldenjson,
+        extra_filter,
+        extra_filter_args,
+    ):
+        self.pt = pt
+        self.filterbit = filterbit
+        self.avoid_ecal_transition_tags = avoid_ecal_transition_tags
+        self.avoid_ecal_transition_probes = avoid_ecal_transition_probes
+        self.goldenjson = goldenjson
+        # parse the golden JSON once here so that only the compact mask is shipped with the task graph
+        self.lumimask = load_lumimask(goldenjson) if goldenjson is not None else None
+        self.extra_filter = extra_filter
+        self.extra_filter_args = extra_filter_args
+
+    def __call__(self, events, flag_passing=False, skim=False):
+        good_events, zcands = self.find_zcands(events)
+        return self.find_all_probes(
+            good_events, zcands, flag_passing=flag_passing, skim=skim
+        )
+
+    def hlt_path(self, pt):
+        """The name of the HLT path, without the `HLT_` prefix, that the passing probes must have fired."""
+        raise NotImplementedError
+
+    def probe_pt_cut(self, pt):
+        """The Pt cut on the offline probe electrons."""
+        return pt - 3
+
+    def trigobj_pt_cut(self, pt):
+        """The Pt cut on the trigger objects that the probes are matched to."""
+        return pt
+
+    def required_columns(self, legs=None):
+        """The NanoAOD branches that are read to find the probes of the legs.
+
+        Parameters
+        ----------
+            legs : list of tuples, optional
+                A list of the form `[(pt, filterbit), ...]` with the Pt threshold and the filter bit of each leg.
+                The default is the leg of this implementation.
+
+        Returns
+        -------
+            frozenset of str
+                The names of the branches. The branches used by `extra_filter` are not included.
+        """
+        if legs is None:
+            legs = [(self.pt, self.filterbit)]
+        columns = {"nElectron", "nTrigObj", "HLT_Ele30_WPTight_Gsf"}
+        columns.update(f"Electron_{field}" for field in self.electron_columns)
+        columns.update(f"TrigObj_{field}" for field in self.trigobj_columns)
+        columns.update(f"HLT_{self.hlt_path(pt)}" for pt, _ in legs)
+        if self.lumimask is not None:
+            columns.update({"run", "luminosityBlock"})
+        return frozenset(columns)
+
+    def find_zcands(self, events):
+        """Select the events and build the Z candidates in both tag/probe orderings.
+
+        This part only depends on the event selection and not on the trigger under study,
+        so it can be shared between many triggers that run over the same events.
+
+        Returns
+        -------
+            good_events : coffea.nanoevents.NanoEventsArray
+                The selected events.
+            zcands : dask_awkward.Array
+                The electron pairs of every event in both orderings with the `tag` and `probe` electrons
+                and the `mass`, `dr` and `charge_product` of the pair.
+        """
+        if self.extra_filter is not None:
+            events = self.extra_filter(events, **self.extra_filter_args)
+        if self.lumimask is not None:
+            events = self.apply_lumimasking(events)
+        good_events, good_locations = self.filter_events(events)
+        ele_for_tnp = good_events.Electron[good_locations]
+        lib = _array_library(ele_for_tnp)
+        # the supercluster eta is computed once here and reused by the trigger matching, the skims and the histograms
+        ele_for_tnp = lib.with_field(
+            ele_for_tnp, ele_for_tnp.eta + ele_for_tnp.deltaEtaSC, "etaSC"
+        )
+        # The selected events have exactly two electrons so there is a single pair per event.
+        # Pairing the electrons with themselves in reverse order gives both tag/probe orderings at once
+        # with simple element-wise operations instead of two jagged combinations that need to be concatenated.
+        # The mass, the distance and the charge product of the pair are the same in both orderings,
+        # so they are computed once per event and broadcast to the two orderings.
+        first, second = ele_for_tnp[:, 0], ele_for_tnp[:, 1]
+        mass, dr, charge_product, _ = lib.broadcast_arrays(
+            (first + second).mass,
+            first.delta_r(second),
+            first.charge * second.charge,
+            ele_for_tnp.pt,
+        )
+        zcands = lib.zip(
+            {
+                "tag": ele_for_tnp,
+                "probe": ele_for_tnp[:, ::-1],
+                "mass": mass,
+                "dr": dr,
+                "charge_product": charge_product,
+            }
+        )
+        return good_events, zcands
+
+    def find_all_probes(
+        self, good_events, zcands, flag_passing=False, matched_filters=None, skim=False
+    ):
+        """Find the passing and all probes from the Z candidates returned by `find_zcands`."""
+        return self.find_all_probes_on_legs(
+            good_events,
+            zcands,
+            [(self.pt, self.filterbit)],
+            flag_passing=flag_passing,
+            matched_filters=matched_filters,
+            skim=skim,
+        )[0]
+
+    def find_all_probes_on_legs(
+        self,
+        good_events,
+        zcands,
+        legs,
+        flag_passing=False,
+        matched_filters=None,
+        skim=False,
+    ):
+        """Find the passing and all probes for many legs from the Z candidates returned by `find_zcands`.
+
+        The tag selection and the Z candidates are shared between the legs.
+        Only the Pt cut on the probes and the matching of the probes to the trigger objects depend on the leg.
+
+        Parameters
+        ----------
+            good_events : coffea.nanoevents.NanoEventsArray
+                The selected events returned by `find_zcands`.
+            zcands : dask_awkward.Array
+                The electron pairs in both orderings returned by `find_zcands`.
+            legs : list of tuples
+                A list of the form `[(pt, filterbit), ...]` with the Pt threshold and the filter bit of each leg.
+            flag_passing : bool, optional
+                Whether to return a single array of all the probes with a boolean `passing` field
+                instead of separate arrays of the passing and all probes. The default is False.
+            matched_filters : list of tuples, optional
+                The `[(filterbit, pt), ...]` filters that `zcands` have already been matched to with `match_trigger_filters`.
+                They must include the ones returned by `trigger_filters(legs)`.
+                The default is None, meaning that the Z candidates are matched here.
+            skim : bool, optional
+                Whether to return the array of all the probes with the `passing` field and the extra `mass`,
+                `run`, `luminosityBlock` and `event` fields that are written to the skims. The default is False.
+
+        Returns
+        -------
+            probes : list
+                A list with one entry per leg. Each entry is a tuple of the form `(passing_probes, all_probes)`
+                or, if `flag_passing` or `skim` is True, the array of all the probes with the extra `passing` field.
+                The probes have the `pt`, `eta`, `phi` and supercluster eta `etaSC` fields.
+        """
+        if matched_filters is None:
+            matched_filters = self.trigger_filters(legs)
+            zcands = self.match_trigger_filters(good_events, zcands, matched_filters)
+        lib = _array_library(zcands)
+
+        if self.avoid_ecal_transition_tags:
+            tags = zcands.tag
+            pass_eta_ebeegap_tags = (abs(tags.eta) < 1.4442) | (abs(tags.eta) > 1.566)
+            zcands = zcands[pass_eta_ebeegap_tags]
+        if self.avoid_ecal_transition_probes:
+            probes = zcands.probe
+            pass_eta_ebeegap_probes = (abs(probes.eta) < 1.4442) | (
+                abs(probes.eta) > 1.566
+            )
+            zcands = zcands[pass_eta_ebeegap_probes]
+
+        probes = []
+        for a, pass_probe in self.find_probes_on_legs(
+            zcands, good_events, legs, matched_filters, skim=skim
+        ):
+            if skim:
+                probes.append(lib.flatten(lib.with_field(a, pass_probe, "passing")))
+                continue
+            if flag_passing:
+                flagged_probes = lib.flatten(
+                    lib.zip(
+                        {
+                            "pt": a.pt,
+                            "eta": a.eta,
+                            "phi": a.phi,
+                            "etaSC": a.etaSC,
+                            "passing": pass_probe,
+                        }
+                    )
+                )
+                probes.append(flagged_probes)
+                continue
+
+            p = a[pass_probe]
+            passing_probes = lib.flatten(
+                lib.zip(
+                    {
+                        "pt": p.pt,
+                        "eta": p.eta,
+                        "phi": p.phi,
+                        "etaSC": p.etaSC,
+                    }
+                )
+            )
+            all_probes = lib.flatten(
+                lib.zip(
+                    {
+                        "pt": a.pt,
+                        "eta": a.eta,
+                        "phi": a.phi,
+                        "etaSC": a.etaSC,
+                    }
+                )
+            )
+            probes.append((passing_probes, all_probes))
+
+        return probes
+
+    def apply_lumimasking(self, events):
+        mask = self.lumimask(events.run, events.luminosityBlock)
+        return events[mask]
+
+    def filter_events(self, events):
+        pass_selection, good = select_tag_candidates(
+            events.HLT.Ele30_WPTight_Gsf, events.Electron
+        )
+        good_events = events[good]
+        good_locations = pass_selection[good]
+        return good_events, good_locations
+
+    def trigger_filters(self, legs):
+        """The `[(filterbit, pt), ...]` trigger object filters of the tags followed by the ones of the probes of every leg."""
+        return [self.tag_filter] + [
+            (filterbit, self.trigobj_pt_cut(pt)) for pt, filterbit in legs
+        ]
+
+    def match_trigger_filters(self, good_events, zcands, filters):
+        """Match the electrons of the Z candidates returned by `find_zcands` to the trigger objects once for many filters.
+
+        The id of the trigger objects is checked once and all the filters are decoded from a single delta R matching.
+        The bitmasks of the matched filters are stored in the `tag_bits` and `probe_bits` fields of the returned Z candidates.
+
+        Parameters
+        ----------
+            good_events : coffea.nanoevents.NanoEventsArray
+                The selected events returned by `find_zcands`.
+            zcands : dask_awkward.Array
+                The electron pairs in both orderings returned by `find_zcands`.
+            filters : list of tuples
+                A list of the form `[(filterbit, pt), ...]` with the filters to match the electrons to.
+
+        Returns
+        -------
+            zcands : dask_awkward.Array
+                The Z candidates with the extra `tag_bits` and `probe_bits` fields.
+        """
+        trigobjs = good_events.TrigObj
+        trigobjs = trigobjs[abs(trigobjs.id) == 11]
+        # the tags of the Z candidates are all the electrons and the probes are the same electrons in reverse order
+        matched_bits = trigger_match_bits_SC(zcands.tag, trigobjs, filters, dr=0.1)
+        lib = _array_library(matched_bits)
+        return lib.zip(
+            {
+                **{field: zcands[field] for field in zcands.fields},
+                "tag_bits": matched_bits,
+                "probe_bits": matched_bits[:, ::-1],
+            }
+        )
+
+    @staticmethod
+    def _filter_index(matched_filters, trigger_filter):
+        # the position of a filter in the bitmasks returned by `match_trigger_filters`
+        try:
+            return matched_filters.index(trigger_filter)
+        except ValueError:
+            raise ValueError(
+                f"The Z candidates were not matched to the trigger filter {trigger_filter}. Matched filters: {matched_filters}. "
+                "Match them to the filters returned by `trigger_filters(legs)`."
+            ) from None
+
+    def find_probes_on_legs(
+        self, zcands, good_events, legs, matched_filters, skim=False
+    ):
+        lib = _array_library(zcands)
+        tag_filter, *probe_filters = (
+            self._filter_index(matched_filters, trigger_filter)
+            for trigger_filter in self.trigger_filters(legs)
+        )
+
+        probe_pt_cuts = [self.probe_pt_cut(pt) for pt, _ in legs]
+        pt_cond_tags = zcands.tag.pt > self.tag_pt_cut
+        pt_cond_probes = zcands.probe.pt > min(probe_pt_cuts)
+        trig_matched_tag = (zcands.tag_bits >> tag_filter) & 1 == 1
+        zcands = zcands[trig_matched_tag & pt_cond_tags & pt_cond_probes]
+        events_with_tags = lib.num(zcands.tag, axis=1) >= 1
+        zcands = zcands[events_with_tags]
+        hlt = good_events[events_with_tags].HLT
+        probes = zcands.probe
+        mass = zcands.mass
+        in_mass_window = abs(mass - 91.1876) < 30
+        opposite_charge = zcands.charge_product == -1
+        isZ = in_mass_window & opposite_charge
+        dr_condition = zcands.dr > 0.0
+        if skim:
+            # keep the pair mass and the event ids of every probe for the skims
+            events = good_events[events_with_tags]
+            run, lumi, event, _ = lib.broadcast_arrays(
+                events.run, events.luminosityBlock, events.event, mass
+            )
+            probes = lib.zip(
+                {
+                    "pt": probes.pt,
+                    "eta": probes.eta,
+                    "phi": probes.phi,
+                    "etaSC": probes.etaSC,
+                    "mass": mass,
+                    "run": run,
+                    "luminosityBlock": lumi,
+                    "event": event,
+                }
+            )
+        probe_cands = probes[isZ & dr_condition]
+        probe_bits = zcands.probe_bits[isZ & dr_condition]
+
+        # return all the probes of each leg together with the mask of the passing ones
+        probes_on_legs = []
+        for (pt, _), probe_pt_cut, probe_filter in zip(
+            legs, probe_pt_cuts, probe_filters
+        ):
+            trig_matched_probe = (probe_bits >> probe_filter) & 1 == 1
+            pass_probe = trig_matched_probe & getattr(hlt, self.hlt_path(pt))
+            if probe_pt_cut > min(probe_pt_cuts):
+                pass_pt_probes = probe_cands.pt > probe_pt_cut
+                all_probes = probe_cands[pass_pt_probes]
+                pass_probe = pass_probe[pass_pt_probes]
+            else:
+                all_probes = probe_cands
+            probes_on_legs.append((all_probes, pass_probe))
+        return probes_on_legs
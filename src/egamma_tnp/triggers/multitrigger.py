@@ -0,0 +1,549 @@
+from functools import partial
+
+import dask_awkward as dak
+from coffea.dataset_tools import apply_to_fileset
+from coffea.nanoevents import NanoAODSchema
+
+from egamma_tnp.triggers.basedoubleelectrontrigger import BaseDoubleElectronTrigger
+from egamma_tnp.utils.execution import _run_local
+from egamma_tnp.utils.skim import _write_tnp_skims
+
+
+class MultiTrigger:
+    def __init__(self, triggers):
+        """Tag and Probe efficiency for many HLT triggers from NanoAOD in a single pass over the events.
+
+        The lumi masking, the event selection, the building of the Z candidates and the matching to the trigger objects
+        are done once per chunk. Single electron triggers of the same kind, like a scan of the thresholds of one HLT family,
+        also share the tag and Z selection so that only the probe Pt cut and the HLT bit are evaluated for every threshold.
+        Use `threshold_scan` to build one for many thresholds of the same trigger.
+
+        Parameters
+        ----------
+            triggers : list
+                The trigger objects to calculate the efficiencies for, e.g.
+                `[ElePt_WPTight_Gsf(fileset, 30), ElePt_WPTight_Gsf(fileset, 32), DoubleElePt_CaloIdL_MW(fileset, 33)]`.
+                All of them must be defined on the same fileset and with the same `goldenjson`,
+                `extra_filter` and `extra_filter_args` since the event selection is shared between them.
+        """
+        triggers = list(triggers)
+        if not triggers:
+            raise ValueError("At least one trigger must be provided.")
+
+        first = triggers[0]
+        for trigger in triggers[1:]:
+            if (
+                trigger.fileset is not first.fileset
+                and trigger.fileset != first.fileset
+            ):
+                raise ValueError(
+                    f"All triggers must be defined on the same fileset but {trigger.name} is not."
+                )
+            if (
+                trigger.goldenjson != first.goldenjson
+                or trigger._extra_filter is not first._extra_filter
+                or trigger._extra_filter_args != first._extra_filter_args
+            ):
+                raise ValueError(
+                    f"All triggers must share the same goldenjson, extra_filter and extra_filter_args but {trigger.name} does not."
+                )
+
+        names = [trigger.name for trigger in triggers]
+        duplicates = {name for name in names if names.count(name) > 1}
+        if duplicates:
+            raise ValueError(f"Duplicate triggers: {sorted(duplicates)}")
+
+        self.triggers = triggers
+        self.fileset = first.fileset
+        self.goldenjson = first.goldenjson
+
+    @classmethod
+    def threshold_scan(cls, trigger_class, fileset, trigger_pts, **kwargs):
+        """Tag and Probe efficiency for many Pt thresholds of the same single electron HLT trigger in a single pass over the events.
+
+        Parameters
+        ----------
+            trigger_class : type
+                The single electron trigger class, e.g. `ElePt_WPTight_Gsf`.
+            fileset : dict
+                The fileset to calculate the trigger efficiencies for.
+            trigger_pts : list of int or float
+                The Pt thresholds of the trigger, e.g. `[30, 32, 35, 115]`.
+            **kwargs
+                Extra keyword arguments passed to `trigger_class` for every threshold,
+                e.g. `avoid_ecal_transition_probes` or `goldenjson`.
+
+        Returns
+        -------
+            MultiTrigger
+                The histograms and arrays are keyed by the name of the trigger of every threshold,
+                e.g. `"HLT_Ele32_WPTight_Gsf"`.
+        """
+        from egamma_tnp.triggers.basesingleelectrontrigger import (
+            BaseSingleElectronTrigger,
+        )
+
+        if not issubclass(trigger_class, BaseSingleElectronTrigger):
+            raise ValueError(
+                f"Threshold scans are only supported for single electron triggers, not {trigger_class.__name__}."
+            )
+        trigger_pts = list(trigger_pts)
+        if not trigger_pts:
+            raise ValueError("At least one trigger Pt threshold must be provided.")
+
+        return cls(
+            [trigger_class(fileset, trigger_pt, **kwargs) for trigger_pt in trigger_pts]
+        )
+
+    def get_tnp_arrays(
+        self,
+        schemaclass=NanoAODSchema,
+        uproot_options=None,
+        compute=False,
+        scheduler=None,
+        progress=False,
+    ):
+        """Get the Pt and Eta arrays of the passing and all probes for every trigger.
+        WARNING: Not recommended to be used for large datasets as the arrays can be very large.
+
+        Parameters
+        ----------
+            schemaclass: BaseSchema, default NanoAODSchema
+                The nanoevents schema to interpret the input dataset with.
+            uproot_options : dict, optional
+                Options to pass to uproot. Pass at least {"allow_read_errors_with_report": True} to turn on file access reports.
+            compute : bool, optional
+                Whether to return the computed arrays or the delayed arrays.
+                The default is False.
+            scheduler : str, optional
+                The dask scheduler to use. The default is None.
+                Only used if compute is True.
+            progress : bool, optional
+                Whether to show a progress bar if `compute` is True. The default is False.
+                Only meaningful if compute is True and no distributed Client is used.
+
+        Returns
+        -------
+            A tuple of the form (arrays, report) if `allow_read_errors_with_report` is True, otherwise just arrays.
+            arrays : dict of dicts of the same form as fileset where for each dataset the following dictionary is present:
+                A dictionary of the form `{"name": (passing_probes, all_probes), ...}` where `"name"` is the name of the trigger.
+                For double electron triggers, the value is instead a dictionary of the form
+                `{"leg1": (passing_probes, all_probes), "leg2": (passing_probes, all_probes)}`.
+                `passing_probes` and `all_probes` are the same as the ones returned by the `get_tnp_arrays` method of each trigger.
+            report: dict of awkward arrays of the same form as fileset.
+                For each dataset an awkward array that contains information about the file access is present.
+        """
+        if uproot_options is None:
+            uproot_options = {}
+
+        data_manipulation = partial(
+            self._make_tnp_arrays, perform_tnps=self._make_tnpimpls()
+        )
+
+        to_compute = apply_to_fileset(
+            data_manipulation=data_manipulation,
+            fileset=self.fileset,
+            schemaclass=schemaclass,
+            uproot_options=uproot_options,
+        )
+        if compute:
+            import dask
+            from dask.diagnostics import ProgressBar
+
+            if progress:
+                pbar = ProgressBar()
+                pbar.register()
+
+            computed = dask.compute(to_compute, scheduler=scheduler)
+
+            if progress:
+                pbar.unregister()
+
+            return computed[0]
+
+        return to_compute
+
+    def get_tnp_histograms(
+        self,
+        schemaclass=NanoAODSchema,
+        uproot_options=None,
+        plateau_cuts=None,
+        eta_regions_pt=None,
+        eta_regions_eta=None,
+        eta_regions_phi=None,
+        pass_fail_axis=False,
+        eta_variable="eta",
+        compute=False,
+        scheduler=None,
+        progress=False,
+        cache=None,
+        executor="dask",
+        max_workers=None,
+    ):
+        """Get the Pt and Eta histograms of the passing and all probes for every trigger.
+
+        Parameters
+        ----------
+            schemaclass: BaseSchema, default NanoAODSchema
+                The nanoevents schema to interpret the input dataset with.
+            uproot_options : dict, optional
+                Options to pass to uproot. Pass at least {"allow_read_errors_with_report": True} to turn on file access reports.
+            plateau_cuts : dict, optional
+                A dictionary of the form `{"name": plateau_cut, ...}` where `"name"` is the name of the trigger
+                and `plateau_cut` is the Pt threshold to use to ensure that we are on the efficiency plateau for eta and phi histograms.
+                For double electron triggers, `plateau_cut` can also be a tuple `(plateau_cut1, plateau_cut2)` to use a different cut for each leg.
+                Triggers that are not in the dictionary get no extra cut.
+                The default is None, meaning that no extra cut is applied for any trigger.
+            eta_regions_pt : dict, optional
+                A dictionary of the form `{"name": [etamin, etamax], ...}`
+                where name is the name of the region and etamin and etamax are the absolute eta bounds.
+                The Pt histograms will be split into those eta regions.
+                The default is to avoid the ECAL transition region meaning |eta| < 1.4442 or 1.566 < |eta| < 2.5.
+            eta_regions_eta : dict, optional
+                A dictionary of the form `{"name": [etamin, etamax], ...}`
+                where name is the name of the region and etamin and etamax are the absolute eta bounds.
+                The Eta histograms will be split into those eta regions.
+                The default is to use the entire |eta| < 2.5 region.
+            eta_regions_phi : dict, optional
+                A dictionary of the form `{"name": [etamin, etamax], ...}`
+                where name is the name of the region and etamin and etamax are the absolute eta bounds.
+                The Phi histograms will be split into those eta regions.
+                The default is to use the entire |eta| < 2.5 region.
+            pass_fail_axis : bool, optional
+                Whether to fill a single histogram per variable with a `region` category axis and a boolean `passing` axis
+                instead of separate histograms of the passing and all probes for every eta region.
+                Wrap the computed histograms of a dataset in `egamma_tnp.utils.PassFailHistograms` to get the usual layout.
+                The default is False.
+            eta_variable : str, optional
+                The probe variable to use for the Eta histograms and the eta regions,
+                either "eta" or "etaSC" for the supercluster eta of the probes. The default is "eta".
+            compute : bool, optional
+                Whether to return the computed hist.Hist histograms or the delayed hist.dask.Hist histograms.
+                The default is False.
+            scheduler : str, optional
+                The dask scheduler to use. The default is None.
+                Only used if compute is True.
+            progress : bool, optional
+                Whether to show a progress bar if `compute` is True. The default is False.
+                Only meaningful if compute is True and no distributed Client is used.
+            cache : egamma_tnp.utils.HistogramCache, optional
+                A cache to return the histograms from if they have already been computed with the same inputs
+                and to store them in otherwise. Only used if compute is True or the executor is not "dask". The default is None.
+                The fileset must be preprocessed with `coffea.dataset_tools.preprocess` so that its files are identified by their UUIDs.
+            executor : str, optional
+                Either "dask" to build the task graph of the histograms with dask-awkward,
+                "eager" to read the chunks of the fileset one after the other into eager awkward arrays
+                and return the computed histograms without building and optimizing a task graph,
+                or "processes" to do the same with the chunks spread over a local pool of processes.
+                The "eager" and "processes" executors are faster for small filesets and on a single machine.
+                They do not support file access reports and ignore `compute`, `scheduler` and `progress`. The default is "dask".
+            max_workers : int, optional
+                The number of processes of the "processes" executor. The default is None, meaning the number of CPUs.
+
+        Returns
+        -------
+            A tuple of the form (histograms, report) if `allow_read_errors_with_report` is True, otherwise just histograms.
+            histograms : dict of dicts of the same form as fileset where for each dataset the following dictionary is present:
+                A dictionary of the form `{"name": {"var": {"region": {"passing": passing_probes, "all": all_probes}, ...}, ...}, ...}`
+                where `"name"` is the name of the trigger.
+                For double electron triggers, there is an extra `{"leg1": ..., "leg2": ...}` level below the name of the trigger.
+                The histograms of each trigger are the same as the ones returned by the `get_tnp_histograms` method of each trigger.
+            report: dict of awkward arrays of the same form as fileset.
+                For each dataset an awkward array that contains information about the file access is present.
+        """
+        if executor not in ("dask", "eager", "processes"):
+            raise ValueError(
+                f"Executor must be 'dask', 'eager' or 'processes', not {executor!r}."
+            )
+        if uproot_options is None:
+            uproot_options = {}
+        if plateau_cuts is None:
+            plateau_cuts = {}
+
+        unknown = set(plateau_cuts) - {trigger.name for trigger in self.triggers}
+        if unknown:
+            raise ValueError(
+                f"Plateau cuts given for unknown triggers: {sorted(unknown)}"
+            )
+
+        if (compute or executor != "dask") and cache is not None:
+            cache_key = cache.key(
+                self,
+                method="get_tnp_histograms",
+                schemaclass=schemaclass,
+                uproot_options=uproot_options,
+                plateau_cuts=plateau_cuts,
+                eta_regions_pt=eta_regions_pt,
+                eta_regions_eta=eta_regions_eta,
+                eta_regions_phi=eta_regions_phi,
+                pass_fail_axis=pass_fail_axis,
+                eta_variable=eta_variable,
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        data_manipulation = partial(
+            self._make_tnp_histograms,
+            perform_tnps=self._make_tnpimpls(),
+            plateau_cuts=self._plateau_cuts_per_leg(plateau_cuts),
+            eta_regions_pt=eta_regions_pt,
+            eta_regions_eta=eta_regions_eta,
+            eta_regions_phi=eta_regions_phi,
+            pass_fail_axis=pass_fail_axis,
+            eta_variable=eta_variable,
+        )
+
+        if executor != "dask":
+            histograms = _run_local(
+                data_manipulation,
+                self.fileset,
+                schemaclass,
+                uproot_options,
+                executor=executor,
+                max_workers=max_workers,
+            )
+            if cache is not None:
+                cache.put(cache_key, histograms)
+            return histograms
+
+        to_compute = apply_to_fileset(
+            data_manipulation=data_manipulation,
+            fileset=self.fileset,
+            schemaclass=schemaclass,
+            uproot_options=uproot_options,
+        )
+        if compute:
+            import dask
+            from dask.diagnostics import ProgressBar
+
+            if progress:
+                pbar = ProgressBar()
+                pbar.register()
+
+            computed = dask.compute(to_compute, scheduler=scheduler)
+
+            if progress:
+                pbar.unregister()
+
+            if cache is not None:
+                cache.put(cache_key, computed[0])
+
+            return computed[0]
+
+        return to_compute
+
+    def write_tnp_skim(
+        self,
+        path,
+        schemaclass=NanoAODSchema,
+        uproot_options=None,
+        compute=True,
+        scheduler=None,
+        progress=False,
+    ):
+        """Write the flattened probes of every dataset to Parquet under `path/dataset/name`,
+        with an extra `leg1` and `leg2` level for double electron triggers.
+
+        The probes are written with their `pt`, `eta`, `phi`, `etaSC`, the `mass` of the tag and probe pair,
+        the `run`, `luminosityBlock` and `event` of the event and the `passing` flag of the trigger.
+        Use `egamma_tnp.utils.get_tnp_histograms_from_skim` to fill the histograms again from the skims
+        with any binning or eta regions without reading the NanoAOD again.
+
+        Parameters
+        ----------
+            path : str
+                The directory to write the skims to.
+            schemaclass: BaseSchema, default NanoAODSchema
+                The nanoevents schema to interpret the input dataset with.
+            uproot_options : dict, optional
+                Options to pass to uproot. Pass at least {"allow_read_errors_with_report": True} to turn on file access reports.
+            compute : bool, optional
+                Whether to write the skims or return the delayed writes.
+                The default is True.
+            scheduler : str, optional
+                The dask scheduler to use. The default is None.
+                Only used if compute is True.
+            progress : bool, optional
+                Whether to show a progress bar if `compute` is True. The default is False.
+                Only meaningful if compute is True and no distributed Client is used.
+
+        Returns
+        -------
+            If `compute` is True, the computed report if `allow_read_errors_with_report` is True, otherwise None.
+            If `compute` is False, the delayed writes, together with the delayed report if `allow_read_errors_with_report` is True.
+        """
+        if uproot_options is None:
+            uproot_options = {}
+
+        data_manipulation = partial(
+            self._find_probes, perform_tnps=self._make_tnpimpls(), skim=True
+        )
+
+        to_compute = apply_to_fileset(
+            data_manipulation=data_manipulation,
+            fileset=self.fileset,
+            schemaclass=schemaclass,
+            uproot_options=uproot_options,
+        )
+        return _write_tnp_skims(to_compute, path, compute, scheduler, progress)
+
+    @property
+    def required_columns(self):
+        """The NanoAOD branches that are read to compute the efficiencies of all the triggers, without the ones used by `extra_filter`.
+
+        Use `egamma_tnp.utils.check_columns` to check that the task graph does not read anything else.
+        """
+        return frozenset().union(
+            *(trigger.required_columns for trigger in self.triggers)
+        )
+
+    def _make_tnpimpls(self):
+        perform_tnps = {}
+        for trigger in self.triggers:
+            if isinstance(trigger, BaseDoubleElectronTrigger):
+                perform_tnps[trigger.name] = {
+                    "leg1": trigger._make_tnpimpl_on_leg("leg1"),
+                    "leg2": trigger._make_tnpimpl_on_leg("leg2"),
+                }
+            else:
+                perform_tnps[trigger.name] = trigger._make_tnpimpl()
+        return perform_tnps
+
+    def _plateau_cuts_per_leg(self, plateau_cuts):
+        per_leg = {}
+        for trigger in self.triggers:
+            plateau_cut = plateau_cuts.get(trigger.name)
+            if isinstance(trigger, BaseDoubleElectronTrigger):
+                if isinstance(plateau_cut, (tuple, list)):
+                    plateau_cut1, plateau_cut2 = plateau_cut
+                else:
+                    plateau_cut1 = plateau_cut2 = plateau_cut
+                per_leg[trigger.name] = {"leg1": plateau_cut1, "leg2": plateau_cut2}
+            else:
+                per_leg[trigger.name] = plateau_cut
+        return per_leg
+
+    def _find_probes(self, events, perform_tnps, flag_passing=False, skim=False):
+        # the event selection is the same for all the triggers so we can use any of them to build the Z candidates
+        first = next(iter(perform_tnps.values()))
+        if isinstance(first, dict):
+            first = first["leg1"]
+        good_events, zcands = first.find_zcands(events)
+
+        legs = {}
+        for name, perform_tnp in perform_tnps.items():
+            if isinstance(perform_tnp, dict):
+                # both legs share the same tags so they are found together
+                legs[name] = [
+                    (perform_tnp["leg1"].pt, perform_tnp["leg1"].filterbit),
+                    (perform_tnp["leg2"].pt, perform_tnp["leg2"].filterbit),
+                ]
+            else:
+                legs[name] = [(perform_tnp.pt, perform_tnp.filterbit)]
+
+        # match the electrons to the trigger objects only once for the filters of all the triggers
+        filters = []
+        for name, perform_tnp in perform_tnps.items():
+            impl = perform_tnp["leg1"] if isinstance(perform_tnp, dict) else perform_tnp
+            for trigger_filter in impl.trigger_filters(legs[name]):
+                if trigger_filter not in filters:
+                    filters.append(trigger_filter)
+        zcands = first.match_trigger_filters(good_events, zcands, filters)
+
+        # single electron triggers of the same kind only differ by their threshold
+        # so they are found together with one leg per threshold on the same selected pairs
+        groups = {}
+        for name, perform_tnp in perform_tnps.items():
+            if not isinstance(perform_tnp, dict):
+                key = (
+                    type(perform_tnp),
+                    perform_tnp.avoid_ecal_transition_tags,
+                    perform_tnp.avoid_ecal_transition_probes,
+                )
+                groups.setdefault(key, []).append(name)
+
+        probes = {}
+        for names in groups.values():
+            probes_on_legs = perform_tnps[names[0]].find_all_probes_on_legs(
+                good_events,
+                zcands,
+                [legs[name][0] for name in names],
+                flag_passing=flag_passing,
+                matched_filters=filters,
+                skim=skim,
+            )
+            probes.update(zip(names, probes_on_legs))
+        for name, perform_tnp in perform_tnps.items():
+            if isinstance(perform_tnp, dict):
+                probes_leg1, probes_leg2 = perform_tnp["leg1"].find_all_probes_on_legs(
+                    good_events,
+                    zcands,
+                    legs[name],
+                    flag_passing=flag_passing,
+                    matched_filters=filters,
+                    skim=skim,
+                )
+                probes[name] = {"leg1": probes_leg1, "leg2": probes_leg2}
+        return {name: probes[name] for name in perform_tnps}
+
+    def _make_tnp_arrays(self, events, perform_tnps):
+        return self._find_probes(events, perform_tnps)
+
+    def _make_tnp_histograms(
+        self,
+        events,
+        perform_tnps,
+        plateau_cuts,
+        eta_regions_pt,
+        eta_regions_eta,
+        eta_regions_phi,
+        pass_fail_axis,
+        eta_variable,
+    ):
+        from egamma_tnp.utils import fill_pass_fail_histograms, fill_tnp_histograms
+
+        delayed = isinstance(events, dak.Array)
+
+        def fill(probes, plateau_cut):
+            if pass_fail_axis:
+                return fill_pass_fail_histograms(
+                    probes,
+                    plateau_cut=plateau_cut,
+                    eta_regions_pt=eta_regions_pt,
+                    eta_regions_eta=eta_regions_eta,
+                    eta_regions_phi=eta_regions_phi,
+                    eta_variable=eta_variable,
+                    delayed=delayed,
+                )
+            passing_probes, all_probes = probes
+            return fill_tnp_histograms(
+                passing_probes,
+                all_probes,
+                plateau_cut=plateau_cut,
+                eta_regions_pt=eta_regions_pt,
+                eta_regions_eta=eta_regions_eta,
+                eta_regions_phi=eta_regions_phi,
+                eta_variable=eta_variable,
+                delayed=delayed,
+            )
+
+        histograms = {}
+        for name, probes in self._find_probes(
+            events, perform_tnps, flag_passing=pass_fail_axis
+        ).items():
+            if isinstance(probes, dict):
+                histograms[name] = {
+                    leg: fill(leg_probes, plateau_cuts[name][leg])
+                    for leg, leg_probes in probes.items()
+                }
+            else:
+                histograms[name] = fill(probes, plateau_cuts[name])
+        return histograms
+
+    def __repr__(self):
+        n_of_files = 0
+        for dataset in self.fileset.values():
+            n_of_files += len(dataset["files"])
+        names = ", ".join(trigger.name for trigger in self.triggers)
+        return f"MultiTrigger({names})(Number of files: {n_of_files}, Golden JSON: {self.goldenjson})"
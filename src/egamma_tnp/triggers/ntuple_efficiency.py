@@ -2,9 +2,11 @@ from functools import partial
 
 import dask_awkward as dak
 from coffea.dataset_tools import apply_to_fileset
-from coffea.lumi_tools import LumiMask
 from coffea.nanoevents import BaseSchema
 
+from egamma_tnp.utils.dataset import prune_fileset
+from egamma_tnp.utils.lumimask import load_lumimask
+
 
 class TagNProbeFromNTuples:
     def __init__(
@@ -23,32 +25,58 @@ class TagNProbeFromNTuples:
         ----------
             fileset: dict
                 The fileset to calculate the trigger efficiencies for.
-            filter: str
+            filter: str or list of str
                 The name of the filter to calculate the efficiencies for.
-            trigger_pt: int or float, optional
+                It can also be a list of filter names to calculate the efficiencies of all of them from a single read of the NTuples,
+                sharing the tag, ID and mass window selection of the probes.
+            trigger_pt: int or float or dict, optional
                 The Pt threshold of the probe electron to calculate efficiencies over that threshold. The default is None.
                 Should be very slightly below the Pt threshold of the filter.
                 If it is None, it will attempt to infer it from the filter name.
                 If it fails to do so, it will set it to 0.
+                For a list of filters, it can be a dictionary of the form `{"filter": trigger_pt, ...}`
+                and the thresholds of the filters that are not in the dictionary are inferred from their names.
             goldenjson: str, optional
                 The golden json to use for luminosity masking. The default is None.
+                If the fileset has been scanned with `egamma_tnp.utils.scan_run_lumi_ranges`,
+                the steps without any certified lumisection are dropped before reading any events.
             extra_filter : Callable, optional
                 An extra function to filter the events. The default is None.
                 Must take in a coffea NanoEventsArray and return a filtered NanoEventsArray of the events you want to keep.
             extra_filter_args : dict, optional
                 Extra arguments to pass to extra_filter. The default is {}.
         """
+        from egamma_tnp.utils.misc import find_pt_threshold
+
         if extra_filter_args is None:
             extra_filter_args = {}
-        if trigger_pt is None:
-            from egamma_tnp.utils.misc import find_pt_threshold
-
-            self.trigger_pt = find_pt_threshold(filter) - 3
-        else:
-            self.trigger_pt = trigger_pt
-        self.fileset = fileset
+        filters = [filter] if isinstance(filter, str) else list(filter)
+        if not filters:
+            raise ValueError("At least one filter must be given.")
+        duplicates = {name for name in filters if filters.count(name) > 1}
+        if duplicates:
+            raise ValueError(f"Filters given more than once: {sorted(duplicates)}")
+        if not isinstance(trigger_pt, dict):
+            trigger_pt = dict.fromkeys(filters, trigger_pt)
+        unknown = set(trigger_pt) - set(filters)
+        if unknown:
+            raise ValueError(f"Trigger Pt given for unknown filters: {sorted(unknown)}")
+        self.trigger_pts = {
+            name: find_pt_threshold(name) - 3
+            if trigger_pt.get(name) is None
+            else trigger_pt[name]
+            for name in filters
+        }
+        self.fileset = (
+            prune_fileset(fileset, goldenjson) if goldenjson is not None else fileset
+        )
         self.filter = filter
+        self.filters = filters
+        self.trigger_pt = (
+            self.trigger_pts[filter] if isinstance(filter, str) else self.trigger_pts
+        )
         self.goldenjson = goldenjson
+        self.lumimask = load_lumimask(goldenjson) if goldenjson is not None else None
         self.extra_filter = extra_filter
         self.extra_filter_args = extra_filter_args
 
@@ -90,6 +118,7 @@ class TagNProbeFromNTuples:
                         The Eta array of the probes.
                     phi: dask_awkward.array
                         The Phi array of the probes.
+                If a list of filters is given, a dictionary of the form `{"filter": (passing_probes, all_probes), ...}` instead.
             report: dict of awkward arrays of the same form as fileset.
                 For each dataset an awkward array that contains information about the file access is present.
         """
@@ -129,9 +158,11 @@ class TagNProbeFromNTuples:
         eta_regions_pt=None,
         eta_regions_eta=None,
         eta_regions_phi=None,
+        pass_fail_axis=False,
         compute=False,
         scheduler=None,
         progress=False,
+        cache=None,
     ):
         """Get the Pt and Eta histograms of the passing and all probes.
 
@@ -141,9 +172,11 @@ class TagNProbeFromNTuples:
                  The nanoevents schema to interpret the input dataset with.
             uproot_options : dict, optional
                 Options to pass to uproot. Pass at least {"allow_read_errors_with_report": True} to turn on file access reports.
-            plateau_cut : int or float, optional
+            plateau_cut : int or float or dict, optional
                 The Pt threshold to use to ensure that we are on the efficiency plateau for eta and phi histograms.
                 The default None, meaning that no extra cut is applied and the activation region is included in those histograms.
+                For a list of filters, it can be a dictionary of the form `{"filter": plateau_cut, ...}`
+                and the filters that are not in the dictionary get no extra cut.
             eta_regions_pt : dict, optional
                 A dictionary of the form `{"name": [etamin, etamax], ...}`
                 where name is the name of the region and etamin and etamax are the absolute eta bounds.
@@ -159,6 +192,11 @@ class TagNProbeFromNTuples:
                 where name is the name of the region and etamin and etamax are the absolute eta bounds.
                 The Phi histograms will be split into those eta regions.
                 The default is to use the entire |eta| < 2.5 region.
+            pass_fail_axis : bool, optional
+                Whether to fill a single histogram per variable with a `region` category axis and a boolean `passing` axis
+                instead of separate histograms of the passing and all probes for every eta region.
+                Wrap the computed histograms of a dataset in `egamma_tnp.utils.PassFailHistograms` to get the usual layout.
+                The default is False.
             compute : bool, optional
                 Whether to return the computed hist.Hist histograms or the delayed hist.dask.Hist histograms.
                 The default is False.
@@ -168,6 +206,10 @@ class TagNProbeFromNTuples:
             progress : bool, optional
                 Whether to show a progress bar if `compute` is True. The default is False.
                 Only meaningful if compute is True and no distributed Client is used.
+            cache : egamma_tnp.utils.HistogramCache, optional
+                A cache to return the histograms from if they have already been computed with the same inputs
+                and to store them in otherwise. Only used if compute is True. The default is None.
+                The fileset must be preprocessed with `coffea.dataset_tools.preprocess` so that its files are identified by their UUIDs.
 
         Returns
         -------
@@ -177,11 +219,33 @@ class TagNProbeFromNTuples:
                 where `"var"` can be `"pt"`, `"eta"`, or `"phi"`.
                 Each `"name"` is the name of eta region specified by the user and `passing_probes` and `all_probes` are `hist.dask.Hist` objects.
                 These are the histograms of the passing and all probes respectively.
+                If a list of filters is given, a dictionary of the form `{"filter": histograms, ...}` with the above histograms of every filter.
             report: dict of awkward arrays of the same form as fileset.
                 For each dataset an awkward array that contains information about the file access is present.
         """
+        if isinstance(plateau_cut, dict):
+            unknown = set(plateau_cut) - set(self.filters)
+            if unknown:
+                raise ValueError(
+                    f"Plateau cuts given for unknown filters: {sorted(unknown)}"
+                )
         if uproot_options is None:
             uproot_options = {}
+        if compute and cache is not None:
+            cache_key = cache.key(
+                self,
+                method="get_tnp_histograms",
+                schemaclass=schemaclass,
+                uproot_options=uproot_options,
+                plateau_cut=plateau_cut,
+                eta_regions_pt=eta_regions_pt,
+                eta_regions_eta=eta_regions_eta,
+                eta_regions_phi=eta_regions_phi,
+                pass_fail_axis=pass_fail_axis,
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
 
         data_manipulation = partial(
             self._make_tnp_histograms,
@@ -189,6 +253,7 @@ class TagNProbeFromNTuples:
             eta_regions_pt=eta_regions_pt,
             eta_regions_eta=eta_regions_eta,
             eta_regions_phi=eta_regions_phi,
+            pass_fail_axis=pass_fail_axis,
         )
 
         to_compute = apply_to_fileset(
@@ -210,41 +275,73 @@ class TagNProbeFromNTuples:
             if progress:
                 pbar.unregister()
 
+            if cache is not None:
+                cache.put(cache_key, computed[0])
+
             return computed[0]
 
         return to_compute
 
-    def _find_probes(self, events):
-        if self.goldenjson is not None:
-            lumimask = LumiMask(self.goldenjson)
-            mask = lumimask(events.run, events.lumi)
+    def _find_probes(self, events, flag_passing=False):
+        probes = self._find_probes_of_filters(events, flag_passing=flag_passing)
+        if isinstance(self.filter, str):
+            return probes[self.filter]
+        return probes
+
+    def _find_probes_of_filters(self, events, flag_passing=False):
+        if self.lumimask is not None:
+            mask = self.lumimask(events.run, events.lumi)
             events = events[mask]
 
+        # the tag, ID and mass window selection is shared between the filters
+        # and only the Pt cut of the probes and the filter branch depend on the filter
+        min_trigger_pt = min(self.trigger_pts.values())
         pass_pt_tags = events.tag_Ele_pt > 35
-        pass_pt_probes = events.el_pt > self.trigger_pt
+        pass_pt_probes = events.el_pt > min_trigger_pt
         pass_tight_id = events.passingCutBasedTight122XV1 == 1
         in_mass_window = abs(events.pair_mass - 91.1876) < 30
-        all_probe_events = events[
+        probe_events = events[
             pass_tight_id & in_mass_window & pass_pt_tags & pass_pt_probes
         ]
-        passing_probe_events = all_probe_events[all_probe_events[self.filter] == 1]
-
-        passing_probes = dak.zip(
-            {
-                "pt": passing_probe_events.el_pt,
-                "eta": passing_probe_events.el_eta,
-                "phi": passing_probe_events.el_phi,
-            }
-        )
-        all_probes = dak.zip(
-            {
-                "pt": all_probe_events.el_pt,
-                "eta": all_probe_events.el_eta,
-                "phi": all_probe_events.el_phi,
-            }
-        )
 
-        return passing_probes, all_probes
+        probes = {}
+        for filter, trigger_pt in self.trigger_pts.items():
+            if trigger_pt > min_trigger_pt:
+                all_probe_events = probe_events[probe_events.el_pt > trigger_pt]
+            else:
+                all_probe_events = probe_events
+            pass_filter = all_probe_events[filter] == 1
+
+            if flag_passing:
+                probes[filter] = dak.zip(
+                    {
+                        "pt": all_probe_events.el_pt,
+                        "eta": all_probe_events.el_eta,
+                        "phi": all_probe_events.el_phi,
+                        "passing": pass_filter,
+                    }
+                )
+                continue
+
+            passing_probe_events = all_probe_events[pass_filter]
+
+            passing_probes = dak.zip(
+                {
+                    "pt": passing_probe_events.el_pt,
+                    "eta": passing_probe_events.el_eta,
+                    "phi": passing_probe_events.el_phi,
+                }
+            )
+            all_probes = dak.zip(
+                {
+                    "pt": all_probe_events.el_pt,
+                    "eta": all_probe_events.el_eta,
+                    "phi": all_probe_events.el_phi,
+                }
+            )
+            probes[filter] = (passing_probes, all_probes)
+
+        return probes
 
     def _make_tnp_histograms(
         self,
@@ -253,15 +350,39 @@ class TagNProbeFromNTuples:
         eta_regions_pt,
         eta_regions_eta,
         eta_regions_phi,
+        pass_fail_axis,
     ):
-        from egamma_tnp.utils import fill_tnp_histograms
+        from egamma_tnp.utils import fill_pass_fail_histograms, fill_tnp_histograms
 
-        passing_probes, all_probes = self._find_probes(events)
-        return fill_tnp_histograms(
-            passing_probes,
-            all_probes,
-            plateau_cut=plateau_cut,
-            eta_regions_pt=eta_regions_pt,
-            eta_regions_eta=eta_regions_eta,
-            eta_regions_phi=eta_regions_phi,
-        )
+        histograms = {}
+        for filter, probes in self._find_probes_of_filters(
+            events, flag_passing=pass_fail_axis
+        ).items():
+            filter_plateau_cut = (
+                plateau_cut.get(filter)
+                if isinstance(plateau_cut, dict)
+                else plateau_cut
+            )
+            if pass_fail_axis:
+                histograms[filter] = fill_pass_fail_histograms(
+                    probes,
+                    plateau_cut=filter_plateau_cut,
+                    eta_regions_pt=eta_regions_pt,
+                    eta_regions_eta=eta_regions_eta,
+                    eta_regions_phi=eta_regions_phi,
+                )
+                continue
+
+            passing_probes, all_probes = probes
+            histograms[filter] = fill_tnp_histograms(
+                passing_probes,
+                all_probes,
+                plateau_cut=filter_plateau_cut,
+                eta_regions_pt=eta_regions_pt,
+                eta_regions_eta=eta_regions_eta,
+                eta_regions_phi=eta_regions_phi,
+            )
+
+        if isinstance(self.filter, str):
+            return histograms[self.filter]
+        return histograms
@@ -1,14 +1,64 @@
-from egamma_tnp.utils.dataset import redirect_files
-from egamma_tnp.utils.histogramming import fill_tnp_histograms, get_ratio_histogram
-from egamma_tnp.utils.misc import delta_r_SC
+import importlib
+
+# the utilities are imported on first access so that importing the package does not import coffea, dask and numba
+_modules = {
+    "HistogramCache": "egamma_tnp.utils.cache",
+    "get_tnp_histograms_incrementally": "egamma_tnp.utils.cache",
+    "check_columns": "egamma_tnp.utils.columns",
+    "necessary_columns": "egamma_tnp.utils.columns",
+    "read_report": "egamma_tnp.utils.columns",
+    "prefilter_fileset": "egamma_tnp.utils.dataset",
+    "prune_fileset": "egamma_tnp.utils.dataset",
+    "redirect_files": "egamma_tnp.utils.dataset",
+    "scan_run_lumi_ranges": "egamma_tnp.utils.dataset",
+    "iter_tnp_arrays": "egamma_tnp.utils.execution",
+    "NumbaWarmUp": "egamma_tnp.utils.jit",
+    "set_numba_cache_dir": "egamma_tnp.utils.jit",
+    "warm_up_numba_kernels": "egamma_tnp.utils.jit",
+    "PassFailHistograms": "egamma_tnp.utils.histogramming",
+    "fill_pass_fail_histograms": "egamma_tnp.utils.histogramming",
+    "fill_tnp_histograms": "egamma_tnp.utils.histogramming",
+    "get_ratio_histogram": "egamma_tnp.utils.histogramming",
+    "load_lumimask": "egamma_tnp.utils.lumimask",
+    "delta_r_SC": "egamma_tnp.utils.misc",
+    "trigger_match_bits_SC": "egamma_tnp.utils.misc",
+    "get_tnp_histograms_from_skim": "egamma_tnp.utils.skim",
+    "read_tnp_skim": "egamma_tnp.utils.skim",
+}
 
 __all__ = (
     "redirect_files",
+    "scan_run_lumi_ranges",
+    "prune_fileset",
+    "prefilter_fileset",
     "fill_tnp_histograms",
+    "fill_pass_fail_histograms",
+    "PassFailHistograms",
     "get_ratio_histogram",
     "delta_r_SC",
+    "trigger_match_bits_SC",
+    "load_lumimask",
+    "necessary_columns",
+    "check_columns",
+    "read_report",
+    "read_tnp_skim",
+    "get_tnp_histograms_from_skim",
+    "HistogramCache",
+    "get_tnp_histograms_incrementally",
+    "iter_tnp_arrays",
+    "set_numba_cache_dir",
+    "warm_up_numba_kernels",
+    "NumbaWarmUp",
 )
 
 
+def __getattr__(name):
+    if name not in _modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_modules[name]), name)
+    globals()[name] = value
+    return value
+
+
 def dir():
     return __all__
@@ -0,0 +1,399 @@
+import functools
+import hashlib
+import json
+import os
+import pickle
+import types
+import warnings
+
+
+class HistogramCache:
+    """An on-disk cache of computed histograms keyed by the hash of everything that determines them.
+
+    The key of `get_tnp_histograms` is built from the fileset (including the file UUIDs and the entry ranges of every step
+    of a preprocessed fileset), the class and the parameters of the trigger, the content of the golden JSON,
+    the bytecode, constants, defaults and closure variables of the functions like `extra_filter`,
+    the arguments of the call, the binning of `egamma_tnp.config` and the version of the package.
+    Only preprocessed filesets can be cached since a file is identified by its path and UUID,
+    so that the cached histograms are not returned for a file that was rewritten in place.
+    Every entry is stored as a pickle file named after its key. The least recently used entries are evicted
+    when the total size of the cache grows above `max_size`.
+
+    Parameters
+    ----------
+        directory : str, optional
+            The directory to store the cached histograms in. The default is "~/.cache/egamma_tnp/histograms".
+        max_size : int, optional
+            The maximum total size of the cache in bytes. The default is 1 GB.
+    """
+
+    def __init__(self, directory=None, max_size=1_000_000_000):
+        if directory is None:
+            directory = os.path.join("~", ".cache", "egamma_tnp", "histograms")
+        self.directory = os.path.expanduser(directory)
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, trigger, **kwargs):
+        """The hash of a trigger and the arguments of the `get_tnp_histograms` call.
+
+        Parameters
+        ----------
+            trigger : object
+                The tag and probe object whose histograms are cached.
+            **kwargs
+                The arguments of the call that change the histograms.
+
+        Returns
+        -------
+            str
+                The hexadecimal SHA-256 hash of the key.
+
+        Raises
+        ------
+            ValueError
+                If a file of the fileset of the trigger has no UUID or steps, i.e. the fileset has not been preprocessed.
+        """
+        from egamma_tnp import __version__, config
+
+        _check_preprocessed(trigger.fileset)
+        content = {
+            "trigger": _normalize(trigger),
+            "goldenjson": _goldenjson_hash(getattr(trigger, "goldenjson", None)),
+            "kwargs": _normalize(kwargs),
+            "config": config.runtime_config,
+            "version": __version__,
+        }
+        encoded = json.dumps(content, sort_keys=True, default=repr).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def step_key(self, trigger, file_uuid, object_path, step, metadata=None, **kwargs):
+        """The hash of the histograms of a single step of a file.
+
+        It is the same as `key` except that the fileset of the trigger is replaced by the UUID of the file,
+        the name of the tree, the entry range of the step and the metadata of its dataset, so that the partial histograms of a step
+        stay valid when other files are added to the fileset.
+
+        Parameters
+        ----------
+            trigger : object
+                The tag and probe object whose histograms are cached.
+            file_uuid : str
+                The UUID of the file as found by `coffea.dataset_tools.preprocess`.
+            object_path : str
+                The path of the tree inside the file.
+            step : list
+                The `[entry_start, entry_stop]` range of the step.
+            metadata : dict, optional
+                The metadata of the dataset that the events of the step get, including the `"dataset"` name.
+                The default is None.
+            **kwargs
+                The arguments of the call that change the histograms.
+
+        Returns
+        -------
+            str
+                The hexadecimal SHA-256 hash of the key.
+        """
+        from egamma_tnp import __version__, config
+
+        content = {
+            "trigger": _normalize(trigger, exclude=("fileset",)),
+            "goldenjson": _goldenjson_hash(getattr(trigger, "goldenjson", None)),
+            "kwargs": _normalize(kwargs),
+            "config": config.runtime_config,
+            "version": __version__,
+            "file": [file_uuid, object_path, list(step)],
+            "metadata": _normalize(metadata),
+        }
+        encoded = json.dumps(content, sort_keys=True, default=repr).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key):
+        """Get the cached histograms of a key or None if they are not cached."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        # mark the entry as recently used for the eviction
+        os.utime(path)
+        return value
+
+    def put(self, key, value, evict=True):
+        """Store the histograms of a key and, if `evict` is True, evict the least recently used entries if the cache is too large."""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        if evict:
+            self.evict()
+
+    def invalidate(self, key=None):
+        """Remove the cached histograms of a key or, if `key` is None, all the cached histograms."""
+        if key is None:
+            for entry in self._entries():
+                os.remove(entry.path)
+            return
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Remove the least recently used entries until the total size of the cache is not above `max_size`."""
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if size <= self.max_size:
+                break
+            size -= entry.stat().st_size
+            os.remove(entry.path)
+
+    @property
+    def size(self):
+        """The total size of the cached histograms in bytes."""
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def __len__(self):
+        return len(self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _entries(self):
+        with os.scandir(self.directory) as it:
+            return [entry for entry in it if entry.name.endswith(".pkl")]
+
+
+def _check_preprocessed(fileset):
+    for dataset, info in fileset.items():
+        for path, file_info in info["files"].items():
+            if (
+                not isinstance(file_info, dict)
+                or file_info.get("uuid") is None
+                or file_info.get("steps") is None
+            ):
+                raise ValueError(
+                    f"File {path} of dataset {dataset} has no uuid or steps. The fileset must be preprocessed first to be cached."
+                )
+
+
+def _goldenjson_hash(goldenjson):
+    if goldenjson is None:
+        return None
+    from egamma_tnp.utils.lumimask import load_lumimask
+
+    return load_lumimask(goldenjson).content_hash
+
+
+def _normalize(obj, exclude=(), _stack=()):
+    # turn the trigger objects and their parameters into JSON serializable objects
+    # leaving out the attributes of the trigger objects named in `exclude`
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, (type, types.ModuleType, types.BuiltinFunctionType)):
+        return _qualified_name(obj)
+    if id(obj) in _stack:
+        # a reference cycle, e.g. a recursive function or a decorated function that refers to itself
+        return "<recursive>"
+    _stack = (*_stack, id(obj))
+    if isinstance(obj, dict):
+        return {
+            str(key): _normalize(value, exclude, _stack) for key, value in obj.items()
+        }
+    if isinstance(obj, (list, tuple)):
+        return [_normalize(value, exclude, _stack) for value in obj]
+    if isinstance(obj, (set, frozenset)):
+        return sorted((_normalize(value, exclude, _stack) for value in obj), key=repr)
+    if isinstance(obj, types.FunctionType):
+        # the same function name may hold a different body, e.g. a lambda or a function redefined in a notebook
+        return {
+            "function": _qualified_name(obj),
+            "code": _code_fingerprint(obj.__code__),
+            "defaults": _normalize(obj.__defaults__, exclude, _stack),
+            "kwdefaults": _normalize(obj.__kwdefaults__, exclude, _stack),
+            "closure": [
+                _cell_contents(cell, exclude, _stack) for cell in obj.__closure__ or ()
+            ],
+        }
+    if isinstance(obj, types.MethodType):
+        return {
+            "method": _normalize(obj.__func__, exclude, _stack),
+            "self": _normalize(obj.__self__, exclude, _stack),
+        }
+    if isinstance(obj, functools.partial):
+        return {
+            "partial": _normalize(obj.func, exclude, _stack),
+            "args": _normalize(obj.args, exclude, _stack),
+            "keywords": _normalize(obj.keywords, exclude, _stack),
+        }
+    if callable(obj) and not hasattr(obj, "__dict__"):
+        warnings.warn(
+            f"Cannot fingerprint the callable {obj!r}, it is only identified by its type in the cache key. "
+            "Invalidate the cache if it changes.",
+            stacklevel=2,
+        )
+        return _qualified_name(type(obj))
+    if hasattr(obj, "__dict__"):
+        attributes = {
+            name: value for name, value in vars(obj).items() if name not in exclude
+        }
+        return {
+            "class": _normalize(type(obj)),
+            "attributes": _normalize(attributes, exclude, _stack),
+        }
+    return repr(obj)
+
+
+def _qualified_name(obj):
+    return f"{getattr(obj, '__module__', None)}.{getattr(obj, '__qualname__', obj.__name__)}"
+
+
+def _code_fingerprint(code):
+    # the bytecode, the constants (including the nested functions) and the global names used by a function
+    consts = [
+        _code_fingerprint(const)
+        if isinstance(const, types.CodeType)
+        else _normalize(const)
+        for const in code.co_consts
+    ]
+    content = json.dumps([consts, list(code.co_names)], default=repr).encode()
+    return hashlib.sha256(code.co_code + content).hexdigest()
+
+
+def _cell_contents(cell, exclude, stack):
+    try:
+        contents = cell.cell_contents
+    except ValueError:
+        # an empty cell of a variable that is not assigned yet
+        return None
+    return _normalize(contents, exclude, stack)
+
+
+def get_tnp_histograms_incrementally(
+    trigger, cache, scheduler=None, progress=False, max_in_flight=16, **kwargs
+):
+    """Compute the histograms of a trigger reusing the cached histograms of every step of its fileset.
+
+    The histograms of every step are cached separately under `HistogramCache.step_key`, so that only the steps
+    that have not been processed yet with the same trigger, arguments, binning and package version are computed.
+    The partial histograms of the steps are then summed for every dataset.
+    When new files are appended to a dataset, only the steps of the new files are read.
+
+    The histograms of every step are written to the cache as soon as they are computed, so the cache also acts as a journal
+    of the completed steps: if the run is interrupted, e.g. by a lost worker or batch slot, calling this function again
+    with the same trigger and arguments only processes the remaining steps.
+
+    Parameters
+    ----------
+        trigger : object
+            The tag and probe object, e.g. `ElePt_WPTight_Gsf` or `MultiTrigger`, whose fileset has been preprocessed
+            with `coffea.dataset_tools.preprocess` so that every file has a `"uuid"`, `"object_path"` and `"steps"`.
+        cache : HistogramCache
+            The cache of the partial histograms. Its `max_size` should be large enough to hold the histograms of all the steps.
+        scheduler : str or distributed.Client, optional
+            The dask scheduler to use. The default is None.
+            With a distributed Client, the steps are collected in the order they complete.
+        progress : bool, optional
+            Whether to show a progress bar. The default is False.
+            Only meaningful if no distributed Client is used.
+        max_in_flight : int, optional
+            The maximum number of steps that are computed at once.
+            With the local schedulers, the steps are computed in batches of this size and journaled after every batch.
+            Larger batches keep more cores busy since every batch waits for its slowest step,
+            while smaller batches lose less work when a run is interrupted and hold fewer partial histograms in memory.
+            The default is 16. None means that all the missing steps are computed at once and only journaled at the end.
+        **kwargs
+            Extra arguments of the `get_tnp_histograms` method of the trigger, e.g. `plateau_cut` or `eta_regions_pt`.
+            The file access report is not supported.
+
+    Returns
+    -------
+        histograms : dict
+            The computed histograms of the same form as returned by `get_tnp_histograms(compute=True)`.
+    """
+    import copy
+
+    uproot_options = kwargs.get("uproot_options") or {}
+    if uproot_options.get("allow_read_errors_with_report"):
+        raise ValueError(
+            "The file access report is not supported when computing the histograms incrementally."
+        )
+
+    from egamma_tnp.utils.execution import _dataset_metadata
+
+    _check_preprocessed(trigger.fileset)
+    partials = {}
+    missing_fileset = {}
+    missing_keys = {}
+    for dataset, info in trigger.fileset.items():
+        partials[dataset] = []
+        # the events of the steps keep the metadata and the name of their original dataset
+        metadata = _dataset_metadata(trigger.fileset, dataset)
+        for path, file_info in info["files"].items():
+            for step in file_info["steps"]:
+                key = cache.step_key(
+                    trigger,
+                    file_info["uuid"],
+                    file_info["object_path"],
+                    step,
+                    metadata=metadata,
+                    **kwargs,
+                )
+                cached = cache.get(key)
+                if cached is not None:
+                    partials[dataset].append(cached)
+                    continue
+                # every missing step is processed as a dataset of its own to get its partial histograms
+                name = f"{dataset}:{len(missing_fileset)}"
+                step_info = dict(file_info)
+                step_info["steps"] = [step]
+                step_info.pop("run_lumi_ranges", None)
+                missing_fileset[name] = {
+                    "files": {path: step_info},
+                    "metadata": metadata,
+                }
+                missing_keys[name] = (dataset, key)
+
+    if missing_fileset:
+        from dask.diagnostics import ProgressBar
+
+        from egamma_tnp.utils.execution import _compute_as_completed
+
+        missing_trigger = copy.copy(trigger)
+        missing_trigger.fileset = missing_fileset
+        to_compute = missing_trigger.get_tnp_histograms(compute=False, **kwargs)
+
+        if progress:
+            pbar = ProgressBar()
+            pbar.register()
+
+        try:
+            for name, computed in _compute_as_completed(
+                to_compute, scheduler=scheduler, max_in_flight=max_in_flight
+            ):
+                dataset, key = missing_keys[name]
+                cache.put(key, computed, evict=False)
+                partials[dataset].append(computed)
+        finally:
+            if progress:
+                pbar.unregister()
+            cache.evict()
+
+    from egamma_tnp.utils.execution import _merge_histograms
+
+    histograms = {}
+    for dataset, dataset_partials in partials.items():
+        if not dataset_partials:
+            continue
+        merged = dataset_partials[0]
+        for partial in dataset_partials[1:]:
+            merged = _merge_histograms(merged, partial)
+        histograms[dataset] = merged
+    return histograms
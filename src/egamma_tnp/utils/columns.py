@@ -0,0 +1,93 @@
+import awkward as ak
+
+
+def necessary_columns(to_compute):
+    """Get the branches that the task graph of every dataset reads from the input files.
+
+    Parameters
+    ----------
+        to_compute : dict
+            The delayed output of `get_tnp_histograms` or `get_tnp_arrays` of the same form as the fileset,
+            without the report.
+
+    Returns
+    -------
+        columns : dict
+            A dictionary of the form `{"dataset": frozenset_of_branches, ...}`.
+    """
+    import dask_awkward as dak
+
+    columns = {}
+    for dataset, output in to_compute.items():
+        layers = dak.report_necessary_columns(output)
+        columns[dataset] = frozenset().union(
+            *(layer_columns for layer_columns in layers.values() if layer_columns)
+        )
+    return columns
+
+
+def check_columns(to_compute, required_columns):
+    """Check that the task graph of every dataset only reads the required branches.
+
+    This catches selections that silently pull in extra branches, or entire collections, from the input files.
+
+    Parameters
+    ----------
+        to_compute : dict
+            The delayed output of `get_tnp_histograms` or `get_tnp_arrays` of the same form as the fileset,
+            without the report.
+        required_columns : set of str
+            The branches that are allowed to be read, usually the `required_columns` of the trigger
+            together with the branches used by an `extra_filter`.
+
+    Returns
+    -------
+        columns : dict
+            A dictionary of the form `{"dataset": frozenset_of_branches, ...}` with the branches read for every dataset.
+
+    Raises
+    ------
+        ValueError
+            If the task graph of any dataset reads a branch that is not in `required_columns`.
+    """
+    columns = necessary_columns(to_compute)
+    for dataset, dataset_columns in columns.items():
+        extra = dataset_columns - set(required_columns)
+        if extra:
+            raise ValueError(
+                f"The task graph of dataset {dataset} reads branches that are not required: {sorted(extra)}"
+            )
+    return columns
+
+
+def read_report(report, columns=None):
+    """Summarize the bytes read from the input files for every dataset.
+
+    Parameters
+    ----------
+        report : dict
+            The computed report of the form `{"dataset": report, ...}` that is returned
+            when `uproot_options={"allow_read_errors_with_report": True}` is used.
+        columns : dict, optional
+            The branches read for every dataset as returned by `necessary_columns` or `check_columns`.
+            They are added to the summary if given.
+
+    Returns
+    -------
+        summary : dict
+            A dictionary of the form `{"dataset": {"bytes": ..., "requests": ..., "chunks": ..., "failed": ...}, ...}`
+            with the number of bytes, read requests and chunks requested by uproot, and the number of chunks that failed to be read.
+            If `columns` is given, every dataset also has a sorted list of the `"branches"` read.
+    """
+    summary = {}
+    for dataset, dataset_report in report.items():
+        counters = dataset_report.performance_counters
+        summary[dataset] = {
+            "bytes": int(ak.sum(counters.num_requested_bytes)),
+            "requests": int(ak.sum(counters.num_requests)),
+            "chunks": int(ak.sum(counters.num_requested_chunks)),
+            "failed": int(ak.sum(~ak.is_none(dataset_report.exception))),
+        }
+        if columns is not None:
+            summary[dataset]["branches"] = sorted(columns[dataset])
+    return summary
@@ -17,3 +17,299 @@ def redirect_files(files, *, redirector="root://cmsxrootd.fnal.gov/", isrucio=Fa
         return [redirector + "/store/" + file.split("/store/")[1] for file in files]
     else:
         return [redirector + file for file in files]
+
+
+def _get_run_lumi_ranges(
+    path, object_path, steps, run_branch, lumi_branch, uproot_options
+):
+    import numpy as np
+    import uproot
+
+    entry_start = min(start for start, _ in steps)
+    entry_stop = max(stop for _, stop in steps)
+    with uproot.open({path: object_path}, **uproot_options) as tree:
+        arrays = tree.arrays(
+            [run_branch, lumi_branch],
+            entry_start=entry_start,
+            entry_stop=entry_stop,
+            library="np",
+        )
+    runs = arrays[run_branch].astype(np.uint64)
+    lumis = arrays[lumi_branch].astype(np.uint64)
+
+    ranges = []
+    for start, stop in steps:
+        # order the (run, lumi) pairs lexicographically through a single 64 bit key
+        keys = (
+            runs[start - entry_start : stop - entry_start] << np.uint64(32)
+        ) | lumis[start - entry_start : stop - entry_start]
+        if len(keys) == 0:
+            ranges.append(None)
+            continue
+        min_key, max_key = int(keys.min()), int(keys.max())
+        ranges.append(
+            [min_key >> 32, min_key & 0xFFFFFFFF, max_key >> 32, max_key & 0xFFFFFFFF]
+        )
+    return ranges
+
+
+def scan_run_lumi_ranges(
+    fileset,
+    *,
+    run_branch="run",
+    lumi_branch="luminosityBlock",
+    uproot_options=None,
+    scheduler=None,
+):
+    """Record the first and last (run, lumi) pair of every step of a preprocessed fileset.
+
+    Only the run and lumi branches are read. The ranges are stored under the `"run_lumi_ranges"` key of every file
+    as a list of the form `[[min_run, min_lumi, max_run, max_lumi], ...]` aligned with its `"steps"`
+    (`None` for empty steps) so that the fileset can be saved as JSON next to the preprocessed one
+    and pruned with `prune_fileset` without reading the events again.
+
+    Parameters
+    ----------
+        fileset : dict
+            A fileset preprocessed with `coffea.dataset_tools.preprocess` so that every file has `"object_path"` and `"steps"`.
+        run_branch : str, optional
+            The name of the run branch. The default is "run".
+        lumi_branch : str, optional
+            The name of the lumisection branch. The default is "luminosityBlock" as in NanoAOD.
+            Use "lumi" for the TnP ntuples.
+        uproot_options : dict, optional
+            Options to pass to uproot.
+        scheduler : str, optional
+            The dask scheduler to use. The default is None.
+
+    Returns
+    -------
+        fileset : dict
+            A copy of the fileset with the `"run_lumi_ranges"` of every file added.
+    """
+    import copy
+
+    import dask
+
+    if uproot_options is None:
+        uproot_options = {}
+
+    fileset = copy.deepcopy(fileset)
+    to_compute = {}
+    for dataset, info in fileset.items():
+        for path, file_info in info["files"].items():
+            if not isinstance(file_info, dict) or file_info.get("steps") is None:
+                raise ValueError(
+                    f"File {path} of dataset {dataset} has no steps. The fileset must be preprocessed first."
+                )
+            to_compute[(dataset, path)] = dask.delayed(_get_run_lumi_ranges)(
+                path,
+                file_info["object_path"],
+                file_info["steps"],
+                run_branch,
+                lumi_branch,
+                uproot_options,
+            )
+
+    (computed,) = dask.compute(to_compute, scheduler=scheduler)
+    for (dataset, path), ranges in computed.items():
+        fileset[dataset]["files"][path]["run_lumi_ranges"] = ranges
+
+    return fileset
+
+
+def prune_fileset(fileset, goldenjson):
+    """Drop the steps of a fileset that do not contain any lumisection certified in a golden JSON.
+
+    Only files with the `"run_lumi_ranges"` recorded by `scan_run_lumi_ranges` can be pruned, any other file is kept as is.
+    Files without any step left and datasets without any file left are dropped.
+    Since the ranges are the first and last (run, lumi) pair of every step, a kept step may still contain uncertified lumisections
+    so the events still need to be lumi masked.
+
+    Parameters
+    ----------
+        fileset : dict
+            The fileset to prune.
+        goldenjson : str
+            The path to the golden JSON.
+
+    Returns
+    -------
+        fileset : dict
+            The pruned fileset.
+    """
+    import numpy as np
+
+    from egamma_tnp.utils.lumimask import load_lumimask
+
+    lumimask = load_lumimask(goldenjson)
+
+    pruned = {}
+    for dataset, info in fileset.items():
+        files = {}
+        for path, file_info in info["files"].items():
+            if (
+                not isinstance(file_info, dict)
+                or file_info.get("run_lumi_ranges") is None
+            ):
+                files[path] = file_info
+                continue
+
+            ranges = file_info["run_lumi_ranges"]
+            filled = np.array(
+                [r if r is not None else [0, 0, 0, 0] for r in ranges], dtype=np.uint64
+            ).reshape(-1, 4)
+            keep = lumimask.overlaps(
+                filled[:, 0], filled[:, 1], filled[:, 2], filled[:, 3]
+            )
+            keep &= np.array([r is not None for r in ranges], dtype=bool)
+            if not np.any(keep):
+                continue
+
+            files[path] = dict(file_info)
+            files[path]["steps"] = [
+                step for step, k in zip(file_info["steps"], keep) if k
+            ]
+            files[path]["run_lumi_ranges"] = [r for r, k in zip(ranges, keep) if k]
+
+        if files:
+            pruned[dataset] = dict(info)
+            pruned[dataset]["files"] = files
+
+    return pruned
+
+
+_PRESELECTION_BRANCHES = [
+    "HLT_Ele30_WPTight_Gsf",
+    "Electron_cutBased",
+    "Electron_eta",
+]
+
+
+def _preselection(arrays):
+    import awkward as ak
+
+    from egamma_tnp.triggers.basetnpimpl import select_tag_candidates
+
+    electrons = ak.zip(
+        {"cutBased": arrays.Electron_cutBased, "eta": arrays.Electron_eta}
+    )
+    _, good = select_tag_candidates(arrays.HLT_Ele30_WPTight_Gsf, electrons)
+    return ak.to_numpy(good)
+
+
+def _get_selected_steps(path, object_path, steps, basket_branch, uproot_options):
+    import numpy as np
+    import uproot
+
+    entry_start = min(start for start, _ in steps)
+    entry_stop = max(stop for _, stop in steps)
+    with uproot.open({path: object_path}, **uproot_options) as tree:
+        arrays = tree.arrays(
+            _PRESELECTION_BRANCHES, entry_start=entry_start, entry_stop=entry_stop
+        )
+        basket_offsets = np.asarray(tree[basket_branch].entry_offsets)
+    selected = np.flatnonzero(_preselection(arrays)) + entry_start
+
+    selected_steps = []
+    for start, stop in steps:
+        inner = basket_offsets[(basket_offsets > start) & (basket_offsets < stop)]
+        boundaries = np.concatenate([[start], inner, [stop]])
+        # the number of selected entries in every basket range of the step
+        counts = np.searchsorted(selected, boundaries[1:]) - np.searchsorted(
+            selected, boundaries[:-1]
+        )
+        ranges = []
+        for low, high, count in zip(boundaries[:-1], boundaries[1:], counts):
+            if count == 0:
+                continue
+            if ranges and ranges[-1][1] == low:
+                ranges[-1][1] = int(high)
+            else:
+                ranges.append([int(low), int(high)])
+        selected_steps.append(ranges)
+    return selected_steps
+
+
+def prefilter_fileset(
+    fileset,
+    *,
+    basket_branch="TrigObj_filterBits",
+    uproot_options=None,
+    scheduler=None,
+):
+    """Restrict the steps of a preprocessed NanoAOD fileset to the baskets that contain events passing the event selection.
+
+    This is the first stage of a two-stage read. Only the cheap branches of the event selection of the NanoAOD triggers
+    (`HLT_Ele30_WPTight_Gsf`, `Electron_cutBased` and `Electron_eta`) are read here
+    and the events are selected with the same `select_tag_candidates` as the triggers.
+    Every step is split at the basket boundaries of `basket_branch` and only the basket ranges with at least one selected event are kept,
+    so that the heavy `Electron` and `TrigObj` branches are not read and decompressed for the baskets without any tag and probe pair
+    when the triggers are run on the returned fileset.
+    The results are the same as with the original fileset since the skipped events fail the event selection anyway.
+
+    Parameters
+    ----------
+        fileset : dict
+            A fileset preprocessed with `coffea.dataset_tools.preprocess` so that every file has `"object_path"` and `"steps"`.
+        basket_branch : str, optional
+            The branch whose basket boundaries the steps are aligned to. The default is "TrigObj_filterBits".
+        uproot_options : dict, optional
+            Options to pass to uproot.
+        scheduler : str, optional
+            The dask scheduler to use. The default is None.
+
+    Returns
+    -------
+        fileset : dict
+            A copy of the fileset with the selected steps. Files without any step left and datasets without any file left are dropped.
+            The `"run_lumi_ranges"` recorded by `scan_run_lumi_ranges` are kept for the steps that come from the same original step.
+    """
+    import dask
+
+    if uproot_options is None:
+        uproot_options = {}
+
+    to_compute = {}
+    for dataset, info in fileset.items():
+        for path, file_info in info["files"].items():
+            if not isinstance(file_info, dict) or file_info.get("steps") is None:
+                raise ValueError(
+                    f"File {path} of dataset {dataset} has no steps. The fileset must be preprocessed first."
+                )
+            to_compute[(dataset, path)] = dask.delayed(_get_selected_steps)(
+                path,
+                file_info["object_path"],
+                file_info["steps"],
+                basket_branch,
+                uproot_options,
+            )
+
+    (computed,) = dask.compute(to_compute, scheduler=scheduler)
+
+    prefiltered = {}
+    for dataset, info in fileset.items():
+        files = {}
+        for path, file_info in info["files"].items():
+            selected_steps = computed[(dataset, path)]
+            if not any(selected_steps):
+                continue
+
+            files[path] = dict(file_info)
+            files[path]["steps"] = [
+                step for ranges in selected_steps for step in ranges
+            ]
+            if file_info.get("run_lumi_ranges") is not None:
+                files[path]["run_lumi_ranges"] = [
+                    run_lumi_range
+                    for ranges, run_lumi_range in zip(
+                        selected_steps, file_info["run_lumi_ranges"]
+                    )
+                    for _ in ranges
+                ]
+
+        if files:
+            prefiltered[dataset] = dict(info)
+            prefiltered[dataset]["files"] = files
+
+    return prefiltered
@@ -0,0 +1,242 @@
+import copy
+
+
+def _get_client(scheduler):
+    # the distributed Client to stream the results from, if any
+    try:
+        from distributed import Client, default_client
+    except ImportError:
+        return None
+
+    if isinstance(scheduler, Client):
+        return scheduler
+    if scheduler is not None:
+        return None
+    try:
+        return default_client()
+    except ValueError:
+        return None
+
+
+def _merge_histograms(histograms1, histograms2):
+    if isinstance(histograms1, dict):
+        return {
+            key: _merge_histograms(histograms1[key], histograms2[key])
+            for key in histograms1
+        }
+    return histograms1 + histograms2
+
+
+def _fileset_chunks(fileset):
+    # the (dataset, path, object_path, step) of every chunk, a whole file being a single chunk if it has no steps
+    for dataset, info in fileset.items():
+        for path, file_info in info["files"].items():
+            if isinstance(file_info, str):
+                object_path, steps = file_info, None
+            else:
+                object_path, steps = file_info["object_path"], file_info.get("steps")
+            for step in steps or [None]:
+                yield dataset, path, object_path, step
+
+
+def _dataset_metadata(fileset, dataset):
+    # the same metadata as the events get with `coffea.dataset_tools.apply_to_fileset`
+    metadata = copy.deepcopy(fileset[dataset].get("metadata") or {})
+    metadata.setdefault("dataset", dataset)
+    return metadata
+
+
+def _process_chunk(
+    data_manipulation, path, object_path, step, schemaclass, uproot_options, metadata
+):
+    from coffea.nanoevents import NanoEventsFactory
+
+    entry_start, entry_stop = step if step is not None else (None, None)
+    events = NanoEventsFactory.from_root(
+        {path: object_path},
+        entry_start=entry_start,
+        entry_stop=entry_stop,
+        schemaclass=schemaclass,
+        metadata=metadata,
+        uproot_options=uproot_options,
+        delayed=False,
+    ).events()
+    return data_manipulation(events)
+
+
+def _set_runtime_config(runtime_config):
+    from egamma_tnp import config
+
+    config.runtime_config = runtime_config
+
+
+def _run_local(
+    data_manipulation,
+    fileset,
+    schemaclass,
+    uproot_options,
+    executor="eager",
+    max_workers=None,
+):
+    """Process every chunk of the fileset with eager awkward arrays and sum the histograms of every dataset.
+
+    With the "eager" executor, the chunks are processed one after the other in the current process.
+    With the "processes" executor, they are spread over a `concurrent.futures.ProcessPoolExecutor` of `max_workers` processes
+    that start with the configuration of this process.
+    The histograms of the chunks are summed in the order of the fileset in both cases, so the results are the same.
+    """
+    if uproot_options.get("allow_read_errors_with_report"):
+        raise ValueError("The file access report is only supported with dask.")
+
+    chunks = list(_fileset_chunks(fileset))
+    arguments = [
+        (
+            data_manipulation,
+            path,
+            object_path,
+            step,
+            schemaclass,
+            uproot_options,
+            _dataset_metadata(fileset, dataset),
+        )
+        for dataset, path, object_path, step in chunks
+    ]
+
+    if executor == "processes" and chunks:
+        from concurrent.futures import ProcessPoolExecutor
+
+        from egamma_tnp import config
+
+        # the processes may be spawned without the configuration set in this process, e.g. the binning
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_set_runtime_config,
+            initargs=(config.runtime_config,),
+        ) as pool:
+            results = pool.map(_process_chunk, *zip(*arguments))
+            return _sum_chunks(chunks, results)
+
+    results = (_process_chunk(*chunk_arguments) for chunk_arguments in arguments)
+    return _sum_chunks(chunks, results)
+
+
+def _sum_chunks(chunks, results):
+    histograms = {}
+    for (dataset, *_), computed in zip(chunks, results):
+        if dataset in histograms:
+            histograms[dataset] = _merge_histograms(histograms[dataset], computed)
+        else:
+            histograms[dataset] = computed
+    return histograms
+
+
+def _compute_as_completed(to_compute, scheduler=None, max_in_flight=None):
+    """Compute a dictionary of dask collections and yield the `(key, result)` pairs as soon as they are computed.
+
+    With a distributed Client, at most `max_in_flight` collections are submitted at once and the results are yielded
+    in the order they complete. With the local schedulers, the collections are computed in batches of `max_in_flight`.
+    Only the results that have not been consumed yet and the ones in flight are held in memory.
+    """
+    import dask
+
+    keys = list(to_compute)
+    if max_in_flight is None:
+        max_in_flight = len(keys)
+    max_in_flight = max(max_in_flight, 1)
+
+    client = _get_client(scheduler)
+    if client is None:
+        for start in range(0, len(keys), max_in_flight):
+            batch = keys[start : start + max_in_flight]
+            (computed,) = dask.compute(
+                [to_compute[key] for key in batch], scheduler=scheduler
+            )
+            yield from zip(batch, computed)
+        return
+
+    from dask.base import unpack_collections
+    from distributed import as_completed
+
+    pending = iter(keys)
+    futures = as_completed()
+    future_keys = {}
+    in_flight = {}
+
+    def submit():
+        key = next(pending, None)
+        if key is None:
+            return
+        # the collections of a key are submitted together so that they are optimized
+        # and share the reading of the events as with dask.compute
+        collections, repack = unpack_collections(to_compute[key])
+        submitted = client.compute(list(collections))
+        in_flight[key] = [repack, submitted, len(submitted)]
+        for future in submitted:
+            future_keys[future.key] = key
+            futures.add(future)
+
+    for _ in range(max_in_flight):
+        submit()
+    for future in futures:
+        key = future_keys.pop(future.key)
+        in_flight[key][2] -= 1
+        if in_flight[key][2] > 0:
+            continue
+        repack, submitted, _ = in_flight.pop(key)
+        (result,) = repack(
+            [submitted_future.result() for submitted_future in submitted]
+        )
+        submit()
+        yield key, result
+
+
+def iter_tnp_arrays(trigger, max_in_flight=4, scheduler=None, **kwargs):
+    """Iterate over the computed probe arrays of every partition instead of computing all of them at once.
+
+    The partitions are computed at most `max_in_flight` at a time and every one of them is yielded as soon as it is computed,
+    so that only the probes of the partitions that are in flight or not consumed yet are held in memory.
+
+    Parameters
+    ----------
+        trigger : object
+            The tag and probe object, e.g. `ElePt_WPTight_Gsf`, `DoubleElePt_CaloIdL_MW` or `MultiTrigger`.
+        max_in_flight : int, optional
+            The maximum number of partitions that are computed at once. The default is 4.
+        scheduler : str or distributed.Client, optional
+            The dask scheduler to use. The default is None.
+            With a distributed Client, the partitions are yielded in the order they complete.
+        **kwargs
+            Extra arguments of the `get_tnp_arrays` method of the trigger, e.g. `leg` or `uproot_options`.
+            The file access report is not supported.
+
+    Yields
+    ------
+        dataset : str
+            The name of the dataset.
+        partition : int
+            The index of the partition in the dataset.
+        arrays : object
+            The computed arrays of the partition of the same form as the arrays of a dataset returned by `get_tnp_arrays`,
+            e.g. a tuple `(passing_probes, all_probes)` for single electron triggers.
+    """
+    from dask.base import unpack_collections
+
+    uproot_options = kwargs.get("uproot_options") or {}
+    if uproot_options.get("allow_read_errors_with_report"):
+        raise ValueError(
+            "The file access report is not supported when iterating over the probe arrays."
+        )
+
+    to_compute = {}
+    for dataset, arrays in trigger.get_tnp_arrays(compute=False, **kwargs).items():
+        collections, repack = unpack_collections(arrays)
+        # the arrays of a dataset are all built from the same events so they have the same partitions
+        for partition in range(collections[0].npartitions):
+            (to_compute[(dataset, partition)],) = repack(
+                [collection.partitions[partition] for collection in collections]
+            )
+
+    for (dataset, partition), arrays in _compute_as_completed(
+        to_compute, scheduler=scheduler, max_in_flight=max_in_flight
+    ):
+        yield dataset, partition, arrays
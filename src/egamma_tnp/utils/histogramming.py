@@ -1,3 +1,5 @@
+from collections.abc import Mapping
+
 import numpy as np
 import uproot
 from hist import intervals
@@ -37,6 +39,7 @@ def fill_tnp_histograms(
     eta_regions_pt=None,
     eta_regions_eta=None,
     eta_regions_phi=None,
+    eta_variable="eta",
     delayed=True,
 ):
     """Get the Pt and Eta histograms of the passing and all probes.
@@ -61,6 +64,9 @@ def fill_tnp_histograms(
             where name is the name of the region and etamin and etamax are the absolute eta bounds.
             The Phi histograms will be split into those eta regions.
             The default is to use the entire |eta| < 2.5 region.
+        eta_variable : str, optional
+            The field of the probes to use for the Eta histograms and to split all the histograms into eta regions,
+            either "eta" or "etaSC" for the supercluster eta of the probes found by the triggers. The default is "eta".
         delayed : bool, optional
             Whether the probes arrays are delayed (dask-awkward) or not.
             The default is True.
@@ -74,6 +80,8 @@ def fill_tnp_histograms(
             `passing_probes` and `all_probes` are `hist.Hist` or `hist.dask.Hist` objects.
             These are the histograms of the passing and all probes respectively.
     """
+    _check_eta_variable(eta_variable)
+
     import hist
 
     if delayed:
@@ -85,15 +93,9 @@ def fill_tnp_histograms(
 
     if plateau_cut is None:
         plateau_cut = 0
-    if eta_regions_pt is None:
-        eta_regions_pt = {
-            "barrel": [0.0, 1.4442],
-            "endcap": [1.566, 2.5],
-        }
-    if eta_regions_eta is None:
-        eta_regions_eta = {"entire": [0.0, 2.5]}
-    if eta_regions_phi is None:
-        eta_regions_phi = {"entire": [0.0, 2.5]}
+    eta_regions_pt, eta_regions_eta, eta_regions_phi = _default_eta_regions(
+        eta_regions_pt, eta_regions_eta, eta_regions_phi
+    )
 
     ptbins = egamma_tnp.config.get("ptbins")
     etabins = egamma_tnp.config.get("etabins")
@@ -101,10 +103,12 @@ def fill_tnp_histograms(
 
     pt_pass = passing_probes.pt
     pt_all = all_probes.pt
-    eta_pass = passing_probes.eta
-    eta_all = all_probes.eta
+    eta_pass = passing_probes[eta_variable]
+    eta_all = all_probes[eta_variable]
     phi_pass = passing_probes.phi
     phi_all = all_probes.phi
+    abs_eta_pass = abs(eta_pass)
+    abs_eta_all = abs(eta_all)
 
     histograms = {}
     histograms["pt"] = {}
@@ -115,10 +119,8 @@ def fill_tnp_histograms(
     plateau_mask_all = pt_all > plateau_cut
 
     for name_pt, region_pt in eta_regions_pt.items():
-        eta_mask_pt_pass = (abs(eta_pass) > region_pt[0]) & (
-            abs(eta_pass) < region_pt[1]
-        )
-        eta_mask_pt_all = (abs(eta_all) > region_pt[0]) & (abs(eta_all) < region_pt[1])
+        eta_mask_pt_pass = (abs_eta_pass > region_pt[0]) & (abs_eta_pass < region_pt[1])
+        eta_mask_pt_all = (abs_eta_all > region_pt[0]) & (abs_eta_all < region_pt[1])
         hpt_pass = Hist(
             hist.axis.Variable(ptbins, name=f"hpt_{name_pt}", label="Pt [GeV]")
         )
@@ -131,12 +133,10 @@ def fill_tnp_histograms(
         histograms["pt"][name_pt] = {"passing": hpt_pass, "all": hpt_all}
 
     for name_eta, region_eta in eta_regions_eta.items():
-        eta_mask_eta_pass = (abs(eta_pass) > region_eta[0]) & (
-            abs(eta_pass) < region_eta[1]
-        )
-        eta_mask_eta_all = (abs(eta_all) > region_eta[0]) & (
-            abs(eta_all) < region_eta[1]
+        eta_mask_eta_pass = (abs_eta_pass > region_eta[0]) & (
+            abs_eta_pass < region_eta[1]
         )
+        eta_mask_eta_all = (abs_eta_all > region_eta[0]) & (abs_eta_all < region_eta[1])
         heta_pass = Hist(
             hist.axis.Variable(etabins, name=f"heta_{name_eta}", label="eta")
         )
@@ -149,12 +149,10 @@ def fill_tnp_histograms(
         histograms["eta"][name_eta] = {"passing": heta_pass, "all": heta_all}
 
     for name_phi, region_phi in eta_regions_phi.items():
-        eta_mask_phi_pass = (abs(eta_pass) > region_phi[0]) & (
-            abs(eta_pass) < region_phi[1]
-        )
-        eta_mask_phi_all = (abs(eta_all) > region_phi[0]) & (
-            abs(eta_all) < region_phi[1]
+        eta_mask_phi_pass = (abs_eta_pass > region_phi[0]) & (
+            abs_eta_pass < region_phi[1]
         )
+        eta_mask_phi_all = (abs_eta_all > region_phi[0]) & (abs_eta_all < region_phi[1])
         hphi_pass = Hist(
             hist.axis.Variable(phibins, name=f"hphi_{name_phi}", label="phi")
         )
@@ -169,6 +167,236 @@ def fill_tnp_histograms(
     return histograms
 
 
+def fill_pass_fail_histograms(
+    probes,
+    plateau_cut=None,
+    eta_regions_pt=None,
+    eta_regions_eta=None,
+    eta_regions_phi=None,
+    eta_variable="eta",
+    delayed=True,
+):
+    """Get the Pt, Eta and Phi histograms of the probes with a region and a pass/fail axis.
+
+    Instead of two histograms per variable and eta region, a single histogram per variable is filled
+    with the variable, an integer `region` category axis and a boolean `passing` axis.
+    The names of the regions are stored in the `regions` attribute of the `region` axis.
+    If the eta regions of a variable do not overlap, the region of every probe is found with a single binary search
+    and the histogram is filled once, no matter how many regions there are.
+    Use `PassFailHistograms` to get the same layout as the one returned by `fill_tnp_histograms`.
+
+    Parameters
+    ----------
+        probes : awkward.Array or dask_awkward.Array
+            The probes with the `pt`, `eta`, `phi` and boolean `passing` fields.
+        plateau_cut : int or float, optional
+            The Pt threshold to use to ensure that we are on the efficiency plateau for eta and phi histograms.
+            The default None, meaning that no extra cut is applied and the activation region is included in those histograms.
+        eta_regions_pt : dict, optional
+            A dictionary of the form `{"name": [etamin, etamax], ...}`
+            where name is the name of the region and etamin and etamax are the absolute eta bounds.
+            The Pt histograms will be split into those eta regions.
+            The default is to avoid the ECAL transition region meaning |eta| < 1.4442 or 1.566 < |eta| < 2.5.
+        eta_regions_eta : dict, optional
+            A dictionary of the form `{"name": [etamin, etamax], ...}`
+            where name is the name of the region and etamin and etamax are the absolute eta bounds.
+            The Eta histograms will be split into those eta regions.
+            The default is to use the entire |eta| < 2.5 region.
+        eta_regions_phi : dict, optional
+            A dictionary of the form `{"name": [etamin, etamax], ...}`
+            where name is the name of the region and etamin and etamax are the absolute eta bounds.
+            The Phi histograms will be split into those eta regions.
+            The default is to use the entire |eta| < 2.5 region.
+        eta_variable : str, optional
+            The field of the probes to use for the Eta histograms and to split all the histograms into eta regions,
+            either "eta" or "etaSC" for the supercluster eta of the probes found by the triggers. The default is "eta".
+        delayed : bool, optional
+            Whether the probes arrays are delayed (dask-awkward) or not.
+            The default is True.
+
+    Returns
+    -------
+        histograms : dict
+            A dictionary of the form `{"var": histogram, ...}` where `"var"` can be `"pt"`, `"eta"`, or `"phi"`.
+            Each histogram is a `hist.Hist` or `hist.dask.Hist` object with the axes `"var"`, `"region"` and `"passing"`.
+    """
+    _check_eta_variable(eta_variable)
+
+    import hist
+
+    if delayed:
+        from hist.dask import Hist
+    else:
+        from hist import Hist
+
+    import egamma_tnp
+
+    if plateau_cut is None:
+        plateau_cut = 0
+    eta_regions_pt, eta_regions_eta, eta_regions_phi = _default_eta_regions(
+        eta_regions_pt, eta_regions_eta, eta_regions_phi
+    )
+
+    ptbins = egamma_tnp.config.get("ptbins")
+    etabins = egamma_tnp.config.get("etabins")
+    phibins = egamma_tnp.config.get("phibins")
+
+    on_plateau = probes.pt > plateau_cut
+    values = {"pt": probes.pt, "eta": probes[eta_variable], "phi": probes.phi}
+    abs_eta = abs(values["eta"])
+    # the region index only depends on the eta regions so it is shared between the variables that use the same ones
+    region_indices = {}
+
+    histograms = {}
+    for var, bins, label, regions, plateau_mask in [
+        ("pt", ptbins, "Pt [GeV]", eta_regions_pt, None),
+        ("eta", etabins, "eta", eta_regions_eta, on_plateau),
+        ("phi", phibins, "phi", eta_regions_phi, on_plateau),
+    ]:
+        region_axis = hist.axis.IntCategory(
+            range(len(regions)), name="region", label="eta region"
+        )
+        region_axis.regions = list(regions)
+        h = Hist(
+            hist.axis.Variable(bins, name=var, label=label),
+            region_axis,
+            hist.axis.Boolean(name="passing"),
+        )
+
+        if _regions_overlap(regions):
+            # a probe can be in more than one region so every region has to be filled separately
+            for index, region in enumerate(regions.values()):
+                selected = (abs_eta > region[0]) & (abs_eta < region[1])
+                if plateau_mask is not None:
+                    selected = selected & plateau_mask
+                h.fill(
+                    **{var: values[var][selected]},
+                    region=index,
+                    passing=probes.passing[selected],
+                )
+        else:
+            key = tuple(tuple(region) for region in regions.values())
+            if key not in region_indices:
+                region_indices[key] = _region_index(abs_eta, regions, delayed)
+            region_index = region_indices[key]
+            selected = region_index >= 0
+            if plateau_mask is not None:
+                selected = selected & plateau_mask
+            h.fill(
+                **{var: values[var][selected]},
+                region=region_index[selected],
+                passing=probes.passing[selected],
+            )
+        histograms[var] = h
+
+    return histograms
+
+
+class PassFailHistograms(Mapping):
+    """A read-only view of the histograms returned by `fill_pass_fail_histograms`
+    in the `{"var": {"name": {"passing": passing_probes, "all": all_probes}, ...}, ...}` layout of `fill_tnp_histograms`.
+
+    The histograms of the passing and all probes are only projected out of the multi-axis histograms when accessed,
+    so the histograms must have been computed.
+
+    Parameters
+    ----------
+        histograms : dict
+            A dictionary of the form `{"var": histogram, ...}` as returned by `fill_pass_fail_histograms`.
+    """
+
+    def __init__(self, histograms):
+        self.histograms = histograms
+
+    def __getitem__(self, var):
+        return _PassFailRegions(self.histograms[var])
+
+    def __iter__(self):
+        return iter(self.histograms)
+
+    def __len__(self):
+        return len(self.histograms)
+
+
+class _PassFailRegions(Mapping):
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __getitem__(self, region):
+        regions = self.histogram.axes["region"].regions
+        if region not in regions:
+            raise KeyError(region)
+        index = regions.index(region)
+        return {
+            "passing": self.histogram[{"region": index, "passing": True}],
+            "all": self.histogram[{"region": index, "passing": sum}],
+        }
+
+    def __iter__(self):
+        return iter(self.histogram.axes["region"].regions)
+
+    def __len__(self):
+        return len(self.histogram.axes["region"].regions)
+
+
+def _check_eta_variable(eta_variable):
+    if eta_variable not in ("eta", "etaSC"):
+        raise ValueError(
+            f"eta_variable must be 'eta' or 'etaSC', not {eta_variable!r}."
+        )
+
+
+def _regions_overlap(regions):
+    bounds = sorted(regions.values())
+    return any(high > low for (_, high), (low, _) in zip(bounds, bounds[1:]))
+
+
+def _region_index(abs_eta, regions, delayed):
+    bounds = np.array(list(regions.values()), dtype=np.float64).reshape(-1, 2)
+    if delayed:
+        import dask_awkward as dak
+
+        return dak.map_partitions(
+            _digitize_regions, abs_eta, bounds, label="eta_region_index"
+        )
+    return _digitize_regions(abs_eta, bounds)
+
+
+def _digitize_regions(abs_eta, bounds):
+    """Index of the non overlapping region `etamin < |eta| < etamax` of every probe or -1 if it is in none of them."""
+    import awkward as ak
+
+    order = np.argsort(bounds[:, 0], kind="stable")
+    lows = bounds[order, 0]
+    highs = bounds[order, 1]
+
+    values = ak.to_numpy(ak.typetracer.length_zero_if_typetracer(abs_eta))
+    # the only candidate is the last region that starts below the value
+    position = np.searchsorted(lows, values, side="left") - 1
+    inside = position >= 0
+    inside[inside] = values[inside] < highs[position[inside]]
+    index = np.full(len(values), -1, dtype=np.int64)
+    index[inside] = order[position[inside]]
+
+    index = ak.Array(index)
+    if ak.backend(abs_eta) == "typetracer":
+        index = ak.Array(index.layout.to_typetracer(forget_length=True))
+    return index
+
+
+def _default_eta_regions(eta_regions_pt, eta_regions_eta, eta_regions_phi):
+    if eta_regions_pt is None:
+        eta_regions_pt = {
+            "barrel": [0.0, 1.4442],
+            "endcap": [1.566, 2.5],
+        }
+    if eta_regions_eta is None:
+        eta_regions_eta = {"entire": [0.0, 2.5]}
+    if eta_regions_phi is None:
+        eta_regions_phi = {"entire": [0.0, 2.5]}
+    return eta_regions_pt, eta_regions_eta, eta_regions_phi
+
+
 def save_hists(path, res):
     """Save histograms to a ROOT file.
 
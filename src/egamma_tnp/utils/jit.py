@@ -0,0 +1,102 @@
+import os
+import sys
+import warnings
+
+from distributed import WorkerPlugin
+
+
+def set_numba_cache_dir(directory):
+    """Set the directory of the on-disk cache of the compiled numba kernels.
+
+    The kernels of `egamma_tnp.utils.misc` are compiled with `cache=True` so that a process loads them from the cache
+    instead of compiling them again. By default, numba caches them next to the source files, or in a user-wide directory
+    if the installation is read-only. This has to be called before `egamma_tnp.utils.misc` is imported,
+    which is equivalent to setting the `NUMBA_CACHE_DIR` environment variable before starting Python.
+    The environment variable is set as well so that the subprocesses use the same cache.
+    If `egamma_tnp.utils.misc` has already been imported, the kernels of this process keep their cache directory,
+    so only the environment variable of the subprocesses is set and a warning is emitted.
+
+    Parameters
+    ----------
+        directory : str
+            The directory of the cache, e.g. a directory on a shared filesystem that all the workers can read.
+    """
+    directory = os.path.expanduser(directory)
+    os.makedirs(directory, exist_ok=True)
+    os.environ["NUMBA_CACHE_DIR"] = directory
+    # the cache directory of a kernel is fixed when it is decorated
+    if "egamma_tnp.utils.misc" in sys.modules:
+        warnings.warn(
+            "egamma_tnp.utils.misc has already been imported, the numba kernels of this process keep their cache directory. "
+            f"Only the subprocesses will use {directory}.",
+            stacklevel=2,
+        )
+        return
+
+    import numba
+
+    numba.config.CACHE_DIR = directory
+
+
+def warm_up_numba_kernels(cache_dir=None):
+    """Compile the numba kernels for the types of the NanoAOD branches, or load them from the cache, ahead of time.
+
+    The vectorized `delta_phi` and `delta_r` are compiled when `egamma_tnp.utils.misc` is imported,
+    while the trigger matching kernel is compiled on its first call, which this function triggers on tiny arrays.
+
+    Parameters
+    ----------
+        cache_dir : str, optional
+            The directory of the on-disk cache as in `set_numba_cache_dir`.
+            The default is None, meaning the default cache directory of numba.
+    """
+    if cache_dir is not None:
+        set_numba_cache_dir(cache_dir)
+
+    import awkward as ak
+    import numpy as np
+
+    from egamma_tnp.utils.misc import trigger_match_bits_SC
+
+    electrons = ak.zip(
+        {
+            "eta": np.zeros(1, dtype=np.float32),
+            "deltaEtaSC": np.zeros(1, dtype=np.float32),
+            "phi": np.zeros(1, dtype=np.float32),
+        }
+    )
+    trigobjs = ak.zip(
+        {
+            "eta": np.zeros(1, dtype=np.float32),
+            "phi": np.zeros(1, dtype=np.float32),
+            "pt": np.zeros(1, dtype=np.float32),
+            "filterBits": np.zeros(1, dtype=np.int32),
+        }
+    )
+    electrons = ak.unflatten(electrons, [1])
+    trigobjs = ak.unflatten(trigobjs, [1])
+    trigger_match_bits_SC(electrons, trigobjs, [(1, 0)])
+
+
+class NumbaWarmUp(WorkerPlugin):
+    """A dask worker plugin that loads or compiles the numba kernels when a worker starts with `warm_up_numba_kernels`.
+
+    Register it with `client.register_plugin(NumbaWarmUp(cache_dir))` so that the tasks of a fresh worker do not pay the JIT compilation.
+    With a `cache_dir` on a shared filesystem, only the first worker compiles the kernels and all the others load them from the cache.
+    The `cache_dir` only takes effect in the workers that have not imported `egamma_tnp.utils.misc` yet,
+    so not in the threads of a `Client(processes=False)` where the client already imported it.
+
+    Parameters
+    ----------
+        cache_dir : str, optional
+            The directory of the on-disk cache as in `set_numba_cache_dir`.
+            The default is None, meaning the default cache directory of numba.
+    """
+
+    name = "egamma-tnp-numba-warm-up"
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+
+    def setup(self, worker):
+        warm_up_numba_kernels(self.cache_dir)
@@ -0,0 +1,161 @@
+import hashlib
+import json
+
+import awkward as ak
+import dask_awkward as dak
+import numpy as np
+
+_lumimask_cache = {}
+
+
+class CompactLumiMask:
+    """A luminosity mask stored as sorted arrays of certified run/lumi ranges.
+
+    Every certified range of a golden JSON is encoded as a pair of 64 bit keys `(run << 32) | lumi`
+    for its first and last lumisection so that the lookup is a single `numpy.searchsorted` call.
+    The arrays are small enough to be shipped in the task graph and, when unpickled, the mask is memoized
+    per process by the hash of the golden JSON content so that the same mask is not rebuilt for every chunk.
+    Use `load_lumimask` to create one from a golden JSON file.
+
+    Parameters
+    ----------
+        starts : numpy.ndarray
+            The sorted `(run << 32) | lumi` keys of the first lumisection of every certified range.
+        stops : numpy.ndarray
+            The `(run << 32) | lumi` keys of the last lumisection of every certified range.
+        content_hash : str
+            The hash of the golden JSON content the ranges were built from.
+    """
+
+    def __init__(self, starts, stops, content_hash):
+        self.starts = starts
+        self.stops = stops
+        self.content_hash = content_hash
+
+    @classmethod
+    def from_dict(cls, goldenjson, content_hash):
+        """Build the mask from the content of a golden JSON of the form `{"run": [[lumi_start, lumi_stop], ...], ...}`."""
+        ranges = np.array(
+            [
+                (int(run), start, stop)
+                for run, lumilist in goldenjson.items()
+                for start, stop in lumilist
+            ],
+            dtype=np.uint64,
+        ).reshape(-1, 3)
+        starts = _run_lumi_keys(ranges[:, 0], ranges[:, 1])
+        stops = _run_lumi_keys(ranges[:, 0], ranges[:, 2])
+        order = np.argsort(starts)
+        return cls(starts[order], stops[order], content_hash)
+
+    def __reduce__(self):
+        return _restore_lumimask, (self.starts, self.stops, self.content_hash)
+
+    def __call__(self, runs, lumis):
+        """Check if run and lumi are valid
+
+        Parameters
+        ----------
+            runs : numpy.ndarray or awkward.highlevel.Array or dask_awkward.Array
+                Vectorized list of run numbers
+            lumis : numpy.ndarray or awkward.highlevel.Array or dask_awkward.Array
+                Vectorized list of lumiSection numbers
+
+        Returns
+        -------
+            mask_out : numpy.ndarray or awkward.highlevel.Array or dask_awkward.Array
+                An array of dtype `bool` where valid (run, lumi) tuples
+                will have their corresponding entry set ``True``.
+        """
+        if isinstance(runs, dak.Array):
+            return dak.map_partitions(self._apply, runs, lumis, label="lumimask")
+        return self._apply(runs, lumis)
+
+    def _apply(self, runs, lumis):
+        runs_orig = runs
+        if isinstance(runs, ak.Array):
+            runs = ak.to_numpy(ak.typetracer.length_zero_if_typetracer(runs))
+        if isinstance(lumis, ak.Array):
+            lumis = ak.to_numpy(ak.typetracer.length_zero_if_typetracer(lumis))
+
+        mask_out = self.contains(runs, lumis)
+
+        if isinstance(runs_orig, ak.Array):
+            mask_out = ak.Array(mask_out)
+            if ak.backend(runs_orig) == "typetracer":
+                mask_out = ak.Array(mask_out.layout.to_typetracer(forget_length=True))
+        return mask_out
+
+    def contains(self, runs, lumis):
+        """Vectorized lookup of numpy arrays of runs and lumisections in the certified ranges."""
+        keys = _run_lumi_keys(runs, lumis)
+        index = np.searchsorted(self.starts, keys, side="right") - 1
+        in_range = index >= 0
+        mask_out = np.zeros(keys.shape, dtype=bool)
+        mask_out[in_range] = keys[in_range] <= self.stops[index[in_range]]
+        return mask_out
+
+    def overlaps(self, min_runs, min_lumis, max_runs, max_lumis):
+        """Check if the (run, lumi) intervals `[(min_run, min_lumi), (max_run, max_lumi)]` contain any certified lumisection.
+
+        Parameters
+        ----------
+            min_runs, min_lumis : numpy.ndarray
+                The run and lumisection of the first (run, lumi) pair of every interval.
+            max_runs, max_lumis : numpy.ndarray
+                The run and lumisection of the last (run, lumi) pair of every interval.
+
+        Returns
+        -------
+            numpy.ndarray
+                An array of dtype `bool` that is ``True`` for the intervals that overlap with a certified range.
+        """
+        min_keys = _run_lumi_keys(min_runs, min_lumis)
+        max_keys = _run_lumi_keys(max_runs, max_lumis)
+        # the certified ranges do not overlap so the last range that starts before the end of
+        # the interval is the one that reaches furthest and the only one that needs to be checked
+        index = np.searchsorted(self.starts, max_keys, side="right") - 1
+        in_range = index >= 0
+        overlap = np.zeros(max_keys.shape, dtype=bool)
+        overlap[in_range] = self.stops[index[in_range]] >= min_keys[in_range]
+        return overlap
+
+
+def _run_lumi_keys(runs, lumis):
+    return (np.asarray(runs, dtype=np.uint64) << np.uint64(32)) | np.asarray(
+        lumis, dtype=np.uint64
+    )
+
+
+def _restore_lumimask(starts, stops, content_hash):
+    lumimask = _lumimask_cache.get(content_hash)
+    if lumimask is None:
+        lumimask = CompactLumiMask(starts, stops, content_hash)
+        _lumimask_cache[content_hash] = lumimask
+    return lumimask
+
+
+def load_lumimask(goldenjson):
+    """Load a golden JSON as a `CompactLumiMask`.
+
+    The JSON is only parsed the first time its content is seen in the process.
+
+    Parameters
+    ----------
+        goldenjson : str
+            The path to the golden JSON.
+
+    Returns
+    -------
+        CompactLumiMask
+            The lumi mask of the golden JSON.
+    """
+    with open(goldenjson, "rb") as f:
+        content = f.read()
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    lumimask = _lumimask_cache.get(content_hash)
+    if lumimask is None:
+        lumimask = CompactLumiMask.from_dict(json.loads(content), content_hash)
+        _lumimask_cache[content_hash] = lumimask
+    return lumimask
@@ -9,7 +9,8 @@ import numpy as np
     [
         numba.float32(numba.float32, numba.float32),
         numba.float64(numba.float64, numba.float64),
-    ]
+    ],
+    cache=True,
 )
 def delta_phi(a, b):
     """Compute difference in angle given two angles a and b
@@ -23,7 +24,8 @@ def delta_phi(a, b):
     [
         numba.float32(numba.float32, numba.float32, numba.float32, numba.float32),
         numba.float64(numba.float64, numba.float64, numba.float64, numba.float64),
-    ]
+    ],
+    cache=True,
 )
 def delta_r(eta1, phi1, eta2, phi2):
     r"""Distance in (eta,phi) plane given two pairs of (eta,phi)
@@ -35,11 +37,137 @@ def delta_r(eta1, phi1, eta2, phi2):
     return np.hypot(deta, dphi)
 
 
+def _supercluster_eta(electrons):
+    """The supercluster eta of the electrons, reusing their `etaSC` field if it has already been computed."""
+    if "etaSC" in electrons.fields:
+        return electrons.etaSC
+    return electrons.eta + electrons.deltaEtaSC
+
+
 def delta_r_SC(electron, other):
     """Distance in (eta,phi) plane between electron and another object using the electron's SC eta."""
-    return delta_r(
-        electron.eta + electron.deltaEtaSC, electron.phi, other.eta, other.phi
+    return delta_r(_supercluster_eta(electron), electron.phi, other.eta, other.phi)
+
+
+@numba.njit(cache=True)
+def _trigger_match_bits_kernel(
+    ele_counts,
+    ele_eta,
+    ele_phi,
+    obj_counts,
+    obj_eta,
+    obj_phi,
+    obj_pt,
+    obj_bits,
+    filter_bits,
+    filter_pts,
+    dr,
+):
+    matched_bits = np.zeros(len(ele_eta), dtype=np.uint64)
+    ele_start = 0
+    obj_start = 0
+    for i in range(len(ele_counts)):
+        for j in range(ele_start, ele_start + ele_counts[i]):
+            for k in range(obj_start, obj_start + obj_counts[i]):
+                if delta_r(ele_eta[j], ele_phi[j], obj_eta[k], obj_phi[k]) < dr:
+                    for f in range(len(filter_bits)):
+                        if (obj_bits[k] >> filter_bits[f]) & 1 and obj_pt[
+                            k
+                        ] > filter_pts[f]:
+                            matched_bits[j] |= np.uint64(1) << np.uint64(f)
+        ele_start += ele_counts[i]
+        obj_start += obj_counts[i]
+    return matched_bits
+
+
+def _trigger_match_bits_partition(
+    ele_eta, ele_phi, obj_eta, obj_phi, obj_pt, obj_bits, filter_bits, filter_pts, dr
+):
+    import awkward as ak
+
+    backend = ak.backend(ele_eta)
+    ele_eta = ak.typetracer.length_zero_if_typetracer(ele_eta)
+    ele_phi = ak.typetracer.length_zero_if_typetracer(ele_phi)
+    obj_eta = ak.typetracer.length_zero_if_typetracer(obj_eta)
+    obj_phi = ak.typetracer.length_zero_if_typetracer(obj_phi)
+    obj_pt = ak.typetracer.length_zero_if_typetracer(obj_pt)
+    obj_bits = ak.typetracer.length_zero_if_typetracer(obj_bits)
+
+    ele_counts = ak.to_numpy(ak.num(ele_eta, axis=1))
+    flat_ele_eta = ak.to_numpy(ak.flatten(ele_eta))
+    flat_obj_pt = ak.to_numpy(ak.flatten(obj_pt))
+    matched_bits = _trigger_match_bits_kernel(
+        ele_counts,
+        flat_ele_eta,
+        ak.to_numpy(ak.flatten(ele_phi)),
+        ak.to_numpy(ak.num(obj_eta, axis=1)),
+        ak.to_numpy(ak.flatten(obj_eta)),
+        ak.to_numpy(ak.flatten(obj_phi)),
+        flat_obj_pt,
+        ak.to_numpy(ak.flatten(obj_bits)),
+        filter_bits,
+        # compare in the precision of the inputs like numpy does with python numbers
+        filter_pts.astype(flat_obj_pt.dtype),
+        flat_ele_eta.dtype.type(dr),
+    )
+
+    matched_bits = ak.unflatten(matched_bits, ele_counts)
+    if backend == "typetracer":
+        matched_bits = ak.Array(matched_bits.layout.to_typetracer(forget_length=True))
+    return matched_bits
+
+
+def trigger_match_bits_SC(electrons, trigobjs, filters, dr=0.1):
+    """Match the electrons to the trigger objects once and encode the matched filters of every electron as a bitmask.
+
+    Bit `i` of the bitmask of an electron is set if the electron is within `dr` of a trigger object,
+    using the electron's SC eta, that has the filter bit and passes the Pt cut of `filters[i]`.
+    The distance of every electron and trigger object pair is computed only once no matter how many filters are requested.
+
+    Parameters
+    ----------
+        electrons : awkward.Array or dask_awkward.Array
+            The jagged electrons with the `eta`, `deltaEtaSC` and `phi` fields or with a precomputed `etaSC` field.
+        trigobjs : awkward.Array or dask_awkward.Array
+            The jagged trigger objects with the `eta`, `phi`, `pt` and `filterBits` fields.
+        filters : list of tuples
+            A list of the form `[(filterbit, pt), ...]` with at most 64 filters.
+            A trigger object passes a filter if it has the filter bit `filterbit` set and its Pt is greater than `pt`.
+        dr : float, optional
+            The maximum distance in the (eta, phi) plane. The default is 0.1.
+
+    Returns
+    -------
+        matched_bits : awkward.Array or dask_awkward.Array
+            A jagged `uint64` array with the same structure as `electrons`.
+            Use `(matched_bits >> i) & 1` to get whether the electrons are matched to a trigger object that passes `filters[i]`.
+    """
+    import dask_awkward as dak
+
+    if not 0 < len(filters) <= 64:
+        raise ValueError(
+            f"Between 1 and 64 filters can be matched at once, not {len(filters)}."
+        )
+    filter_bits = np.array([filterbit for filterbit, _ in filters], dtype=np.int64)
+    filter_pts = np.array([pt for _, pt in filters], dtype=np.float64)
+
+    eta_SC = _supercluster_eta(electrons)
+    args = (
+        eta_SC,
+        electrons.phi,
+        trigobjs.eta,
+        trigobjs.phi,
+        trigobjs.pt,
+        trigobjs.filterBits,
+        filter_bits,
+        filter_pts,
+        dr,
     )
+    if isinstance(eta_SC, dak.Array):
+        return dak.map_partitions(
+            _trigger_match_bits_partition, *args, label="trigger_match_bits_SC"
+        )
+    return _trigger_match_bits_partition(*args)
 
 
 def merge_goldenjsons(files, outfile):
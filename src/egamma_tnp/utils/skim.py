@@ -0,0 +1,156 @@
+import os
+
+import awkward as ak
+
+
+def read_tnp_skim(path, filters=None, columns=None):
+    """Read the probes of a skim written with `write_tnp_skim`.
+
+    The skim is read with `pyarrow.dataset` so that the row groups that cannot pass the `filters`
+    are skipped based on their statistics without being read.
+
+    Parameters
+    ----------
+        path : str
+            The directory of the skim of one dataset and trigger, e.g. `"skims/ZJets/HLT_Ele32_WPTight_Gsf"`.
+            For double electron triggers, the directory of one leg, e.g. `"skims/ZJets/HLT_DoubleEle33_CaloIdL_MW/leg1"`.
+        filters : list of tuples, optional
+            Filters of the form `[("pt", ">", 35), ("run", "==", 370000), ...]` that the probes must pass.
+            A list of lists of tuples is interpreted as an OR of ANDs. The default is None, meaning that all the probes are read.
+        columns : list of str, optional
+            The columns to read. The default is None, meaning that all the columns are read.
+
+    Returns
+    -------
+        probes : awkward.Array
+            The flat array of the probes with the `pt`, `eta`, `phi`, `etaSC`, `mass`, `run`, `luminosityBlock`, `event`
+            and `passing` fields.
+    """
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Skim {path} does not exist.")
+
+    dataset = ds.dataset(path, format="parquet")
+    expression = pq.filters_to_expression(filters) if filters else None
+    return ak.from_arrow(dataset.to_table(columns=columns, filter=expression))
+
+
+def get_tnp_histograms_from_skim(
+    path,
+    plateau_cut=None,
+    eta_regions_pt=None,
+    eta_regions_eta=None,
+    eta_regions_phi=None,
+    pass_fail_axis=False,
+    filters=None,
+    eta_variable="eta",
+):
+    """Fill the Pt, Eta and Phi histograms of the passing and all probes from a skim written with `write_tnp_skim`.
+
+    Parameters
+    ----------
+        path : str
+            The directory of the skim of one dataset and trigger as in `read_tnp_skim`.
+        plateau_cut : int or float, optional
+            The Pt threshold to use to ensure that we are on the efficiency plateau for eta and phi histograms.
+            The default None, meaning that no extra cut is applied and the activation region is included in those histograms.
+        eta_regions_pt : dict, optional
+            A dictionary of the form `{"name": [etamin, etamax], ...}`
+            where name is the name of the region and etamin and etamax are the absolute eta bounds.
+            The Pt histograms will be split into those eta regions.
+            The default is to avoid the ECAL transition region meaning |eta| < 1.4442 or 1.566 < |eta| < 2.5.
+        eta_regions_eta : dict, optional
+            A dictionary of the form `{"name": [etamin, etamax], ...}`
+            where name is the name of the region and etamin and etamax are the absolute eta bounds.
+            The Eta histograms will be split into those eta regions.
+            The default is to use the entire |eta| < 2.5 region.
+        eta_regions_phi : dict, optional
+            A dictionary of the form `{"name": [etamin, etamax], ...}`
+            where name is the name of the region and etamin and etamax are the absolute eta bounds.
+            The Phi histograms will be split into those eta regions.
+            The default is to use the entire |eta| < 2.5 region.
+        pass_fail_axis : bool, optional
+            Whether to fill a single histogram per variable with a `region` category axis and a boolean `passing` axis
+            instead of separate histograms of the passing and all probes for every eta region.
+            The default is False.
+        filters : list of tuples, optional
+            Filters that the probes must pass as in `read_tnp_skim`. The default is None.
+        eta_variable : str, optional
+            The column to use for the Eta histograms and the eta regions, either "eta" or "etaSC" for the supercluster eta.
+            The default is "eta".
+
+    Returns
+    -------
+        histograms : dict
+            The same `hist.Hist` histograms that `get_tnp_histograms` of the trigger returns for one dataset.
+    """
+    from egamma_tnp.utils.histogramming import (
+        _check_eta_variable,
+        fill_pass_fail_histograms,
+        fill_tnp_histograms,
+    )
+
+    _check_eta_variable(eta_variable)
+    probes = read_tnp_skim(
+        path, filters=filters, columns=["pt", eta_variable, "phi", "passing"]
+    )
+    if pass_fail_axis:
+        return fill_pass_fail_histograms(
+            probes,
+            plateau_cut=plateau_cut,
+            eta_regions_pt=eta_regions_pt,
+            eta_regions_eta=eta_regions_eta,
+            eta_regions_phi=eta_regions_phi,
+            eta_variable=eta_variable,
+            delayed=False,
+        )
+    return fill_tnp_histograms(
+        probes[probes.passing],
+        probes,
+        plateau_cut=plateau_cut,
+        eta_regions_pt=eta_regions_pt,
+        eta_regions_eta=eta_regions_eta,
+        eta_regions_phi=eta_regions_phi,
+        eta_variable=eta_variable,
+        delayed=False,
+    )
+
+
+def _to_parquet(skims, path):
+    import dask_awkward as dak
+
+    if isinstance(skims, dak.Array):
+        return dak.to_parquet(skims, path, compute=False)
+    return {
+        key: _to_parquet(value, os.path.join(path, key)) for key, value in skims.items()
+    }
+
+
+def _write_tnp_skims(to_compute, path, compute, scheduler, progress):
+    # the output of apply_to_fileset also holds the file access report if it was requested
+    report = None
+    if isinstance(to_compute, tuple):
+        to_compute, report = to_compute
+
+    writes = _to_parquet(to_compute, path)
+    if report is not None:
+        writes = (writes, report)
+
+    if compute:
+        import dask
+        from dask.diagnostics import ProgressBar
+
+        if progress:
+            pbar = ProgressBar()
+            pbar.register()
+
+        computed = dask.compute(writes, scheduler=scheduler)
+
+        if progress:
+            pbar.unregister()
+
+        return computed[0][1] if report is not None else None
+
+    return writes
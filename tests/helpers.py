@@ -0,0 +1,13 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+
+def assert_same_histograms(histograms1, histograms2):
+    """Assert that two nested dictionaries of histograms have the same keys and histogram contents, including the flow bins."""
+    if isinstance(histograms1, Mapping):
+        assert histograms1.keys() == histograms2.keys()
+        for key in histograms1:
+            assert_same_histograms(histograms1[key], histograms2[key])
+    else:
+        assert np.all(histograms1.values(flow=True) == histograms2.values(flow=True))
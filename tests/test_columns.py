@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from egamma_tnp.triggers import (
+    DoubleElePt_CaloIdL_MW,
+    ElePt1_ElePt2_CaloIdL_TrackIdL_IsoVL,
+    ElePt_CaloIdVT_GsfTrkIdT,
+    ElePt_WPTight_Gsf,
+    MultiTrigger,
+)
+from egamma_tnp.utils import check_columns, read_report
+
+fileset = {
+    "sample": {"files": {os.path.abspath("tests/samples/DYto2E.root"): "Events"}}
+}
+goldenjson = "json/Cert_Collisions2023_366442_370790_Golden.json"
+
+
+def make_triggers(goldenjson):
+    return [
+        ElePt_WPTight_Gsf(fileset, 32, goldenjson=goldenjson),
+        ElePt_CaloIdVT_GsfTrkIdT(fileset, 115, goldenjson=goldenjson),
+        DoubleElePt_CaloIdL_MW(fileset, 33, goldenjson=goldenjson),
+        ElePt1_ElePt2_CaloIdL_TrackIdL_IsoVL(fileset, 23, 12, goldenjson=goldenjson),
+    ]
+
+
+@pytest.mark.parametrize("goldenjson", [None, goldenjson])
+def test_only_required_columns(goldenjson):
+    triggers = make_triggers(goldenjson)
+    triggers.append(MultiTrigger(make_triggers(goldenjson)))
+    for trigger in triggers:
+        columns = check_columns(trigger.get_tnp_histograms(), trigger.required_columns)
+        assert columns["sample"] == trigger.required_columns
+        columns = check_columns(trigger.get_tnp_arrays(), trigger.required_columns)
+        assert columns["sample"] <= trigger.required_columns
+    assert ("run" in trigger.required_columns) == (goldenjson is not None)
+
+
+def test_extra_columns():
+    trigger = ElePt_WPTight_Gsf(
+        fileset,
+        32,
+        extra_filter=lambda events: events[events.Electron.r9[:, 0] > 0.5],
+    )
+    with pytest.raises(ValueError, match="Electron_r9"):
+        check_columns(trigger.get_tnp_histograms(), trigger.required_columns)
+    check_columns(
+        trigger.get_tnp_histograms(), trigger.required_columns | {"Electron_r9"}
+    )
+
+
+def test_read_report():
+    import dask
+
+    trigger = ElePt_WPTight_Gsf(fileset, 32)
+    histograms, report = trigger.get_tnp_histograms(
+        uproot_options={"allow_read_errors_with_report": True}
+    )
+    columns = check_columns(histograms, trigger.required_columns)
+    _, report = dask.compute(histograms, report)
+
+    summary = read_report(report, columns)["sample"]
+    assert summary["bytes"] > 0
+    assert summary["chunks"] >= len(columns["sample"])
+    assert summary["failed"] == 0
+    assert summary["branches"] == sorted(trigger.required_columns)
@@ -0,0 +1,42 @@
+import builtins
+import json
+
+import pytest
+
+from egamma_tnp.config.manager import Config
+
+
+def test_no_writes(monkeypatch):
+    original_open = builtins.open
+
+    def read_only_open(file, mode="r", *args, **kwargs):
+        if any(flag in mode for flag in "wax+"):
+            raise AssertionError(f"{file} should not be written.")
+        return original_open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", read_only_open)
+    config = Config()
+    ptbins = config.get("ptbins")
+    config.set("ptbins", [5, 10, 100])
+    assert config.get("ptbins") == [5, 10, 100]
+    config.reset("ptbins")
+    assert config.get("ptbins") == ptbins
+
+
+def test_save_and_load(tmp_path, monkeypatch):
+    filename = tmp_path / "config.json"
+    config = Config()
+    config.set("ptbins", [5, 10, 100])
+    config.save(str(filename))
+    assert json.loads(filename.read_text())["ptbins"] == [5, 10, 100]
+    assert list(tmp_path.iterdir()) == [filename]
+
+    assert Config().get("ptbins") != [5, 10, 100]
+    assert Config(str(filename)).get("ptbins") == [5, 10, 100]
+    monkeypatch.setenv("EGAMMA_TNP_CONFIG", str(filename))
+    loaded = Config()
+    assert loaded.get("ptbins") == [5, 10, 100]
+    assert loaded.get("etabins") == config.get("etabins")
+
+    with pytest.raises(FileNotFoundError):
+        Config(str(tmp_path / "missing.json"))
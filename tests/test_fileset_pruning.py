@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+from coffea.dataset_tools import preprocess
+
+from egamma_tnp.triggers import ElePt_WPTight_Gsf
+from egamma_tnp.utils import prune_fileset, scan_run_lumi_ranges
+
+fileset = {
+    "sample": {"files": {os.path.abspath("tests/samples/DYto2E.root"): "Events"}}
+}
+
+
+@pytest.fixture(scope="module")
+def scanned_fileset():
+    preprocessed, _ = preprocess(fileset, step_size=100, skip_bad_files=False)
+    return scan_run_lumi_ranges(preprocessed, scheduler="sync")
+
+
+def test_scan_run_lumi_ranges(scanned_fileset):
+    file_info = scanned_fileset["sample"]["files"][
+        os.path.abspath("tests/samples/DYto2E.root")
+    ]
+    assert len(file_info["run_lumi_ranges"]) == len(file_info["steps"])
+    for min_run, min_lumi, max_run, max_lumi in file_info["run_lumi_ranges"]:
+        assert (min_run, min_lumi) <= (max_run, max_lumi)
+    json.dumps(scanned_fileset)
+
+
+def test_prune_fileset(scanned_fileset, tmp_path):
+    path = os.path.abspath("tests/samples/DYto2E.root")
+    ranges = scanned_fileset["sample"]["files"][path]["run_lumi_ranges"]
+    run = ranges[0][0]
+    lumi = ranges[0][1]
+
+    goldenjson = tmp_path / "golden.json"
+    goldenjson.write_text(json.dumps({str(run): [[lumi, lumi]]}))
+    pruned = prune_fileset(scanned_fileset, str(goldenjson))
+    steps = pruned["sample"]["files"][path]["steps"]
+    assert 0 < len(steps) < len(scanned_fileset["sample"]["files"][path]["steps"])
+    for min_run, min_lumi, max_run, max_lumi in pruned["sample"]["files"][path][
+        "run_lumi_ranges"
+    ]:
+        assert (min_run, min_lumi) <= (run, lumi) <= (max_run, max_lumi)
+
+    goldenjson.write_text(json.dumps({str(run + 1): [[1, 1000]]}))
+    assert prune_fileset(scanned_fileset, str(goldenjson)) == {}
+
+    # files that have not been scanned are kept as they are
+    assert prune_fileset(fileset, str(goldenjson)) == fileset
+
+
+def test_pruned_histograms(scanned_fileset):
+    goldenjson = "json/Cert_Collisions2023_366442_370790_Golden.json"
+    tag_n_probe = ElePt_WPTight_Gsf(scanned_fileset, 32, goldenjson=goldenjson)
+    assert tag_n_probe.fileset == scanned_fileset
+
+    histograms = tag_n_probe.get_tnp_histograms(compute=True)["sample"]
+    assert (
+        histograms["pt"]["barrel"]["all"].sum(flow=True)
+        + histograms["pt"]["endcap"]["all"].sum(flow=True)
+        == 1153.0
+    )
@@ -0,0 +1,283 @@
+import copy
+import functools
+import os
+import time
+
+import dask
+import dask_awkward as dak
+import numpy as np
+import pytest
+from coffea.dataset_tools import preprocess
+from helpers import assert_same_histograms
+
+from egamma_tnp import config
+from egamma_tnp.triggers import ElePt_WPTight_Gsf
+from egamma_tnp.utils import (
+    HistogramCache,
+    PassFailHistograms,
+    get_tnp_histograms_incrementally,
+)
+
+fileset = {
+    "sample": {"files": {os.path.abspath("tests/samples/DYto2E.root"): "Events"}}
+}
+
+
+@pytest.fixture(scope="module")
+def preprocessed():
+    return preprocess(fileset, skip_bad_files=False)[0]
+
+
+def test_cached_histograms(tmp_path, monkeypatch, preprocessed):
+    cache = HistogramCache(str(tmp_path))
+    tag_n_probe = ElePt_WPTight_Gsf(preprocessed, 32)
+    histograms = tag_n_probe.get_tnp_histograms(
+        plateau_cut=35, compute=True, cache=cache
+    )
+    assert len(cache) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The histograms should be returned from the cache.")
+
+    monkeypatch.setattr(dask, "compute", fail)
+    cached = ElePt_WPTight_Gsf(preprocessed, 32).get_tnp_histograms(
+        plateau_cut=35, compute=True, cache=cache
+    )
+    for region in ["barrel", "endcap"]:
+        for probes in ["passing", "all"]:
+            assert np.all(
+                cached["sample"]["pt"][region][probes].values(flow=True)
+                == histograms["sample"]["pt"][region][probes].values(flow=True)
+            )
+
+    with pytest.raises(AssertionError):
+        tag_n_probe.get_tnp_histograms(plateau_cut=40, compute=True, cache=cache)
+
+    cache.invalidate()
+    assert len(cache) == 0
+    with pytest.raises(AssertionError):
+        tag_n_probe.get_tnp_histograms(plateau_cut=35, compute=True, cache=cache)
+
+    with pytest.raises(ValueError, match="must be preprocessed"):
+        ElePt_WPTight_Gsf(fileset, 32).get_tnp_histograms(compute=True, cache=cache)
+
+
+def test_key(tmp_path, preprocessed):
+    cache = HistogramCache(str(tmp_path))
+    key = cache.key(ElePt_WPTight_Gsf(preprocessed, 32), plateau_cut=35)
+    assert key == cache.key(ElePt_WPTight_Gsf(preprocessed, 32), plateau_cut=35)
+    assert key != cache.key(ElePt_WPTight_Gsf(preprocessed, 30), plateau_cut=35)
+    assert key != cache.key(ElePt_WPTight_Gsf(preprocessed, 32), plateau_cut=None)
+    assert key != cache.key(
+        ElePt_WPTight_Gsf(
+            preprocessed,
+            32,
+            goldenjson="json/Cert_Collisions2023_366442_370790_Golden.json",
+        ),
+        plateau_cut=35,
+    )
+
+    ptbins = config.get("ptbins")
+    config.set("ptbins", [5, 10, 100])
+    try:
+        assert key != cache.key(ElePt_WPTight_Gsf(preprocessed, 32), plateau_cut=35)
+    finally:
+        config.set("ptbins", ptbins)
+
+
+def test_extra_filter_key(tmp_path, preprocessed):
+    cache = HistogramCache(str(tmp_path))
+
+    def key(extra_filter, extra_filter_args=None):
+        return cache.key(
+            ElePt_WPTight_Gsf(
+                preprocessed,
+                32,
+                extra_filter=extra_filter,
+                extra_filter_args=extra_filter_args,
+            )
+        )
+
+    def pt_cut(threshold):
+        return lambda events: events[events.Electron.pt[:, 0] > threshold]
+
+    assert key(pt_cut(10)) == key(pt_cut(10))
+    assert key(pt_cut(10)) != key(pt_cut(20))
+    assert key(lambda events: events[events.run > 1]) != key(
+        lambda events: events[events.run > 2]
+    )
+    assert key(functools.partial(dak.num, axis=1)) != key(
+        functools.partial(dak.num, axis=0)
+    )
+    assert key(dak.num) != key(dak.sum)
+
+
+def test_lru_eviction(tmp_path):
+    cache = HistogramCache(str(tmp_path), max_size=2500)
+    for key in ["a", "b", "c"]:
+        cache.put(key, b"x" * 1000)
+        # make sure that the entries have different modification times
+        time.sleep(0.01)
+    assert "a" not in cache
+    assert "b" in cache and "c" in cache
+
+    assert cache.get("b") == b"x" * 1000
+    time.sleep(0.01)
+    cache.put("d", b"x" * 1000)
+    assert "c" not in cache
+    assert "b" in cache and "d" in cache
+    assert cache.size <= 2500
+
+    cache.invalidate("b")
+    assert "b" not in cache
+    assert cache.get("b") is None
+
+
+@pytest.mark.parametrize("pass_fail_axis", [False, True])
+def test_incremental_histograms(tmp_path, monkeypatch, pass_fail_axis):
+    preprocessed, _ = preprocess(fileset, step_size=250, skip_bad_files=False)
+    (file_info,) = preprocessed["sample"]["files"].values()
+    assert len(file_info["steps"]) == 4
+    # the same file before the last two steps were "appended"
+    partial_fileset = copy.deepcopy(preprocessed)
+    (partial_info,) = partial_fileset["sample"]["files"].values()
+    partial_info["steps"] = partial_info["steps"][:2]
+
+    cache = HistogramCache(str(tmp_path))
+    kwargs = {"plateau_cut": 35, "pass_fail_axis": pass_fail_axis}
+    get_tnp_histograms_incrementally(
+        ElePt_WPTight_Gsf(partial_fileset, 32), cache, **kwargs
+    )
+    assert len(cache) == 2
+
+    tag_n_probe = ElePt_WPTight_Gsf(preprocessed, 32)
+    histograms = get_tnp_histograms_incrementally(tag_n_probe, cache, **kwargs)
+    assert len(cache) == 4
+    expected = tag_n_probe.get_tnp_histograms(compute=True, **kwargs)
+    if pass_fail_axis:
+        histograms = PassFailHistograms(histograms["sample"])
+        expected = PassFailHistograms(expected["sample"])
+    else:
+        histograms, expected = histograms["sample"], expected["sample"]
+    for var in ["pt", "eta", "phi"]:
+        for region in expected[var]:
+            for probes in ["passing", "all"]:
+                assert np.all(
+                    histograms[var][region][probes].values(flow=True)
+                    == expected[var][region][probes].values(flow=True)
+                )
+
+    def fail(*args, **kwargs):
+        raise AssertionError("All the steps should be returned from the cache.")
+
+    monkeypatch.setattr(dask, "compute", fail)
+    get_tnp_histograms_incrementally(tag_n_probe, cache, **kwargs)
+
+    with pytest.raises(ValueError):
+        get_tnp_histograms_incrementally(ElePt_WPTight_Gsf(fileset, 32), cache)
+
+
+def test_resume_interrupted_run(tmp_path, monkeypatch):
+    preprocessed, _ = preprocess(fileset, step_size=250, skip_bad_files=False)
+    tag_n_probe = ElePt_WPTight_Gsf(preprocessed, 32)
+    cache = HistogramCache(str(tmp_path))
+
+    compute = dask.compute
+    calls = []
+
+    def crash_after_two_steps(*args, **kwargs):
+        calls.append(args)
+        if len(calls) > 2:
+            raise RuntimeError("Lost the worker")
+        return compute(*args, **kwargs)
+
+    monkeypatch.setattr(dask, "compute", crash_after_two_steps)
+    with pytest.raises(RuntimeError):
+        get_tnp_histograms_incrementally(tag_n_probe, cache, max_in_flight=1)
+    # the steps completed before the crash are journaled
+    assert len(cache) == 2
+
+    calls.clear()
+    monkeypatch.setattr(dask, "compute", compute)
+    histograms = get_tnp_histograms_incrementally(tag_n_probe, cache, max_in_flight=1)
+    assert len(cache) == 4
+    expected = tag_n_probe.get_tnp_histograms(compute=True)["sample"]
+    for region in ["barrel", "endcap"]:
+        assert np.all(
+            histograms["sample"]["pt"][region]["all"].values(flow=True)
+            == expected["pt"][region]["all"].values(flow=True)
+        )
+
+
+def test_default_batches(tmp_path, monkeypatch):
+    preprocessed, _ = preprocess(fileset, step_size=50, skip_bad_files=False)
+    tag_n_probe = ElePt_WPTight_Gsf(preprocessed, 32)
+    cache = HistogramCache(str(tmp_path))
+
+    compute = dask.compute
+    batches = []
+
+    def record_batches(*args, **kwargs):
+        computed = compute(*args, **kwargs)
+        batches.append(len(computed[0]))
+        return computed
+
+    monkeypatch.setattr(dask, "compute", record_batches)
+    histograms = get_tnp_histograms_incrementally(tag_n_probe, cache)
+    # the 20 steps are journaled in batches of 16 by default
+    assert batches == [16, 4]
+    assert len(cache) == 20
+    assert (
+        histograms["sample"]["pt"]["barrel"]["all"].sum(flow=True)
+        + histograms["sample"]["pt"]["endcap"]["all"].sum(flow=True)
+        == 1153.0
+    )
+
+
+def keep_events_of_era(events, era):
+    # relies on the metadata of the original dataset on the incremental path too
+    assert events.metadata["dataset"] == "sample"
+    if events.metadata["era"] != era:
+        return events[:0]
+    return events
+
+
+def test_incremental_metadata(tmp_path, preprocessed):
+    preprocessed = copy.deepcopy(preprocessed)
+    preprocessed["sample"]["metadata"] = {"era": "2023"}
+    cache = HistogramCache(str(tmp_path))
+    tag_n_probe = ElePt_WPTight_Gsf(
+        preprocessed,
+        32,
+        extra_filter=keep_events_of_era,
+        extra_filter_args={"era": "2023"},
+    )
+    histograms = get_tnp_histograms_incrementally(tag_n_probe, cache)
+    expected = tag_n_probe.get_tnp_histograms(compute=True)
+    assert_same_histograms(histograms, expected)
+    assert histograms["sample"]["pt"]["barrel"]["all"].sum(flow=True) > 0
+
+    # the cached steps of a dataset with other metadata are not reused
+    preprocessed["sample"]["metadata"] = {"era": "2024"}
+    histograms = get_tnp_histograms_incrementally(tag_n_probe, cache)
+    assert len(cache) == 2
+    assert histograms["sample"]["pt"]["barrel"]["all"].sum(flow=True) == 0
+
+
+def test_distributed_incremental_histograms(tmp_path):
+    from distributed import Client
+
+    preprocessed, _ = preprocess(fileset, step_size=250, skip_bad_files=False)
+    tag_n_probe = ElePt_WPTight_Gsf(preprocessed, 32)
+    cache = HistogramCache(str(tmp_path))
+
+    with Client(processes=False, dashboard_address=None):
+        histograms = get_tnp_histograms_incrementally(
+            tag_n_probe, cache, max_in_flight=2
+        )
+    assert len(cache) == 4
+    assert (
+        histograms["sample"]["pt"]["barrel"]["all"].sum(flow=True)
+        + histograms["sample"]["pt"]["endcap"]["all"].sum(flow=True)
+        == 1153.0
+    )
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+import pytest
+
+heavy_modules = (
+    "coffea",
+    "dask",
+    "dask_awkward",
+    "hist",
+    "matplotlib",
+    "mplhep",
+    "numba",
+    "uproot",
+)
+
+
+def run(code):
+    return subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["egamma_tnp", "egamma_tnp.triggers", "egamma_tnp.utils", "egamma_tnp.plot"],
+)
+def test_no_heavy_imports(module):
+    imported = run(
+        f"import sys, {module}; print(' '.join(m for m in {heavy_modules!r} if m in sys.modules))"
+    )
+    assert imported.split() == []
+
+
+def import_time(modules):
+    return float(
+        run(
+            "import time; start = time.perf_counter(); "
+            f"import {modules}; "
+            "print(time.perf_counter() - start)"
+        )
+    )
+
+
+@pytest.mark.benchmark
+def test_cold_import_time():
+    # relative to the heavy dependency that is imported lazily so that the test does not depend on the speed of the machine
+    elapsed = import_time("egamma_tnp.triggers, egamma_tnp.utils, egamma_tnp.plot")
+    assert elapsed < import_time("coffea.nanoevents") / 2
+
+
+def test_lazy_attributes():
+    imported = run(
+        "import egamma_tnp; "
+        "from egamma_tnp.triggers import ElePt_WPTight_Gsf; "
+        "from egamma_tnp.utils import HistogramCache; "
+        "print(egamma_tnp.triggers.ElePt_WPTight_Gsf.__name__, egamma_tnp.utils.HistogramCache.__name__)"
+    )
+    assert imported.split() == ["ElePt_WPTight_Gsf", "HistogramCache"]
+
+    import egamma_tnp.utils
+
+    with pytest.raises(AttributeError):
+        egamma_tnp.utils.missing  # noqa: B018
@@ -0,0 +1,52 @@
+import os
+
+import awkward as ak
+import numpy as np
+import pytest
+from coffea.dataset_tools import preprocess
+
+from egamma_tnp.triggers import DoubleElePt_CaloIdL_MW, ElePt_WPTight_Gsf
+from egamma_tnp.utils import iter_tnp_arrays
+
+fileset = {
+    "sample": {"files": {os.path.abspath("tests/samples/DYto2E.root"): "Events"}}
+}
+
+
+@pytest.fixture(scope="module")
+def preprocessed():
+    preprocessed, _ = preprocess(fileset, step_size=250, skip_bad_files=False)
+    return preprocessed
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 3])
+def test_single_electron_trigger(preprocessed, max_in_flight):
+    tag_n_probe = ElePt_WPTight_Gsf(preprocessed, 32)
+    partitions = list(iter_tnp_arrays(tag_n_probe, max_in_flight=max_in_flight))
+    assert [partition for _, partition, _ in partitions] == [0, 1, 2, 3]
+
+    expected_pass, expected_all = tag_n_probe.get_tnp_arrays(compute=True)["sample"]
+    passing_probes = ak.concatenate([arrays[0] for _, _, arrays in partitions])
+    all_probes = ak.concatenate([arrays[1] for _, _, arrays in partitions])
+    for field in ["pt", "eta", "phi"]:
+        assert np.all(passing_probes[field] == expected_pass[field])
+        assert np.all(all_probes[field] == expected_all[field])
+
+
+def test_double_electron_trigger(preprocessed):
+    tag_n_probe = DoubleElePt_CaloIdL_MW(preprocessed, 33)
+    expected = tag_n_probe.get_tnp_arrays(compute=True)["sample"]
+    partitions = [arrays for _, _, arrays in iter_tnp_arrays(tag_n_probe)]
+    for leg in ["leg1", "leg2"]:
+        all_probes = ak.concatenate([arrays[leg][1] for arrays in partitions])
+        assert np.all(all_probes.pt == expected[leg][1].pt)
+
+
+def test_report_not_supported(preprocessed):
+    with pytest.raises(ValueError):
+        next(
+            iter_tnp_arrays(
+                ElePt_WPTight_Gsf(preprocessed, 32),
+                uproot_options={"allow_read_errors_with_report": True},
+            )
+        )
@@ -0,0 +1,133 @@
+import concurrent.futures
+import functools
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+from helpers import assert_same_histograms
+
+from egamma_tnp import config
+from egamma_tnp.triggers import (
+    DoubleElePt_CaloIdL_MW,
+    ElePt_WPTight_Gsf,
+    MultiTrigger,
+)
+
+fileset = {
+    "sample": {"files": {os.path.abspath("tests/samples/DYto2E.root"): "Events"}}
+}
+chunked_fileset = {
+    "sample": {
+        "files": {
+            os.path.abspath("tests/samples/DYto2E.root"): {
+                "object_path": "Events",
+                "steps": [[0, 300], [300, 700], [700, 1000]],
+            }
+        }
+    }
+}
+
+
+@pytest.mark.parametrize("executor", ["eager", "processes"])
+@pytest.mark.parametrize("fileset", [fileset, chunked_fileset])
+@pytest.mark.parametrize("pass_fail_axis", [False, True])
+def test_single_electron_trigger(fileset, pass_fail_axis, executor):
+    tag_n_probe = ElePt_WPTight_Gsf(fileset, 32, avoid_ecal_transition_probes=True)
+    eager = tag_n_probe.get_tnp_histograms(
+        plateau_cut=35,
+        pass_fail_axis=pass_fail_axis,
+        executor=executor,
+        max_workers=2,
+    )
+    delayed = tag_n_probe.get_tnp_histograms(
+        plateau_cut=35, pass_fail_axis=pass_fail_axis, compute=True
+    )
+    assert_same_histograms(eager, delayed)
+    if not pass_fail_axis:
+        assert eager["sample"]["pt"]["barrel"]["passing"].sum(flow=True) + eager[
+            "sample"
+        ]["pt"]["endcap"]["passing"].sum(flow=True) == pytest.approx(954)
+
+
+@pytest.mark.parametrize("leg", ["first", "second", "both"])
+def test_double_electron_trigger(leg):
+    tag_n_probe = DoubleElePt_CaloIdL_MW(chunked_fileset, 33)
+    eager = tag_n_probe.get_tnp_histograms(leg=leg, executor="eager")
+    delayed = tag_n_probe.get_tnp_histograms(leg=leg, compute=True)
+    assert_same_histograms(eager, delayed)
+
+
+@pytest.mark.parametrize("executor", ["eager", "processes"])
+def test_multitrigger(executor):
+    tag_n_probe = MultiTrigger(
+        [
+            ElePt_WPTight_Gsf(chunked_fileset, 32),
+            DoubleElePt_CaloIdL_MW(chunked_fileset, 33),
+        ]
+    )
+    eager = tag_n_probe.get_tnp_histograms(executor=executor, max_workers=2)
+    delayed = tag_n_probe.get_tnp_histograms(compute=True)
+    assert_same_histograms(eager, delayed)
+
+
+def keep_dataset_events(events, dataset):
+    # relies on the metadata that coffea adds to the events of every dataset
+    assert events.metadata["dataset"] == dataset
+    assert events.metadata["era"] == "2023"
+    return events
+
+
+@pytest.mark.parametrize("executor", ["eager", "processes"])
+def test_metadata(executor):
+    fileset_with_metadata = {
+        "sample": {**chunked_fileset["sample"], "metadata": {"era": "2023"}}
+    }
+    tag_n_probe = ElePt_WPTight_Gsf(
+        fileset_with_metadata,
+        32,
+        extra_filter=keep_dataset_events,
+        extra_filter_args={"dataset": "sample"},
+    )
+    eager = tag_n_probe.get_tnp_histograms(executor=executor, max_workers=2)
+    delayed = tag_n_probe.get_tnp_histograms(compute=True)
+    assert_same_histograms(eager, delayed)
+    assert fileset_with_metadata["sample"]["metadata"] == {"era": "2023"}
+
+
+def test_spawned_processes_use_config(monkeypatch):
+    monkeypatch.setattr(
+        concurrent.futures,
+        "ProcessPoolExecutor",
+        functools.partial(
+            concurrent.futures.ProcessPoolExecutor,
+            mp_context=multiprocessing.get_context("spawn"),
+        ),
+    )
+    tag_n_probe = ElePt_WPTight_Gsf(chunked_fileset, 32)
+    ptbins = config.get("ptbins")
+    config.set("ptbins", [5, 10, 35, 100])
+    try:
+        histograms = tag_n_probe.get_tnp_histograms(executor="processes", max_workers=2)
+        expected = tag_n_probe.get_tnp_histograms(executor="eager")
+    finally:
+        config.set("ptbins", ptbins)
+    assert_same_histograms(histograms, expected)
+    assert np.all(
+        histograms["sample"]["pt"]["barrel"]["all"].axes[0].edges == [5, 10, 35, 100]
+    )
+
+
+def test_invalid_executor():
+    tag_n_probe = ElePt_WPTight_Gsf(fileset, 32)
+    with pytest.raises(ValueError):
+        tag_n_probe.get_tnp_histograms(executor="threads")
+    with pytest.raises(ValueError):
+        tag_n_probe.get_tnp_histograms(
+            uproot_options={"allow_read_errors_with_report": True}, executor="eager"
+        )
+    with pytest.raises(ValueError):
+        tag_n_probe.get_tnp_histograms(
+            uproot_options={"allow_read_errors_with_report": True},
+            executor="processes",
+        )
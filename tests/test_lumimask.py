@@ -0,0 +1,51 @@
+import pickle
+
+import awkward as ak
+import dask_awkward as dak
+import numpy as np
+import pytest
+from coffea.lumi_tools import LumiMask
+
+from egamma_tnp.utils import load_lumimask
+
+goldenjsons = [
+    "json/Cert_Collisions2022_355100_362760_Golden.json",
+    "json/Cert_Collisions2023_366442_370790_Golden.json",
+]
+
+
+def random_runs_and_lumis(goldenjson, size=100_000):
+    import json
+
+    with open(goldenjson) as f:
+        runs = np.array([int(run) for run in json.load(f)], dtype=np.uint32)
+    rng = np.random.default_rng(42)
+    # include runs that are not certified at all around the certified ones
+    runs = rng.integers(runs.min() - 10, runs.max() + 10, size=size).astype(np.uint32)
+    lumis = rng.integers(1, 2000, size=size).astype(np.uint32)
+    return runs, lumis
+
+
+@pytest.mark.parametrize("goldenjson", goldenjsons)
+def test_same_as_coffea_lumimask(goldenjson):
+    runs, lumis = random_runs_and_lumis(goldenjson)
+    expected = LumiMask(goldenjson)(runs, lumis)
+
+    lumimask = load_lumimask(goldenjson)
+    assert np.any(expected)
+    assert np.all(lumimask(runs, lumis) == expected)
+    assert ak.all(lumimask(ak.Array(runs), ak.Array(lumis)) == ak.Array(expected))
+
+    delayed = lumimask(
+        dak.from_awkward(ak.Array(runs), npartitions=4),
+        dak.from_awkward(ak.Array(lumis), npartitions=4),
+    )
+    assert ak.all(delayed.compute() == ak.Array(expected))
+
+
+@pytest.mark.parametrize("goldenjson", goldenjsons)
+def test_memoized(goldenjson):
+    lumimask = load_lumimask(goldenjson)
+    assert load_lumimask(goldenjson) is lumimask
+    assert pickle.loads(pickle.dumps(lumimask)) is lumimask
+    assert len(pickle.dumps(lumimask)) < len(open(goldenjson, "rb").read())
@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+import pytest
+from helpers import assert_same_histograms
+
+from egamma_tnp.triggers import (
+    DoubleElePt_CaloIdL_MW,
+    ElePt_CaloIdVT_GsfTrkIdT,
+    ElePt_WPTight_Gsf,
+    MultiTrigger,
+)
+
+fileset = {
+    "sample": {"files": {os.path.abspath("tests/samples/DYto2E.root"): "Events"}}
+}
+
+
+def test_local_compute():
+    triggers = [
+        ElePt_WPTight_Gsf(fileset, 32, avoid_ecal_transition_probes=True),
+        ElePt_CaloIdVT_GsfTrkIdT(fileset, 115),
+        DoubleElePt_CaloIdL_MW(fileset, 33, avoid_ecal_transition_probes=True),
+    ]
+    multi = MultiTrigger(triggers)
+
+    histograms = multi.get_tnp_histograms(
+        plateau_cuts={"HLT_Ele32_WPTight_Gsf": 35, "HLT_DoubleEle33_CaloIdL_MW": 35},
+        compute=True,
+    )["sample"]
+
+    assert set(histograms.keys()) == {
+        "HLT_Ele32_WPTight_Gsf",
+        "HLT_Ele115_CaloIdVT_GsfTrkIdT",
+        "HLT_DoubleEle33_CaloIdL_MW",
+    }
+
+    expected = triggers[0].get_tnp_histograms(plateau_cut=35, compute=True)["sample"]
+    assert_same_histograms(histograms["HLT_Ele32_WPTight_Gsf"], expected)
+    assert (
+        histograms["HLT_Ele32_WPTight_Gsf"]["pt"]["barrel"]["all"].sum(flow=True)
+        + histograms["HLT_Ele32_WPTight_Gsf"]["pt"]["endcap"]["all"].sum(flow=True)
+        == 1153.0
+    )
+
+    expected = triggers[1].get_tnp_histograms(compute=True)["sample"]
+    assert_same_histograms(histograms["HLT_Ele115_CaloIdVT_GsfTrkIdT"], expected)
+
+    expected = triggers[2].get_tnp_histograms(
+        plateau_cut1=35, plateau_cut2=35, compute=True
+    )["sample"]
+    for leg in ["leg1", "leg2"]:
+        assert_same_histograms(
+            histograms["HLT_DoubleEle33_CaloIdL_MW"][leg], expected[leg]
+        )
+
+
+def test_local_compute_arrays():
+    triggers = [ElePt_WPTight_Gsf(fileset, 30), ElePt_WPTight_Gsf(fileset, 32)]
+    arrays = MultiTrigger(triggers).get_tnp_arrays(compute=True)["sample"]
+
+    for trigger in triggers:
+        expected_pass, expected_all = trigger.get_tnp_arrays(compute=True)["sample"]
+        passing_probes, all_probes = arrays[trigger.name]
+        for field in ["pt", "eta", "phi"]:
+            assert np.all(passing_probes[field] == expected_pass[field])
+            assert np.all(all_probes[field] == expected_all[field])
+
+
+def test_incompatible_triggers():
+    with pytest.raises(ValueError):
+        MultiTrigger([])
+    with pytest.raises(ValueError):
+        MultiTrigger(
+            [
+                ElePt_WPTight_Gsf(fileset, 30),
+                ElePt_WPTight_Gsf(
+                    fileset,
+                    32,
+                    goldenjson="json/Cert_Collisions2023_366442_370790_Golden.json",
+                ),
+            ]
+        )
+    with pytest.raises(ValueError):
+        MultiTrigger([ElePt_WPTight_Gsf(fileset, 30), ElePt_WPTight_Gsf(fileset, 30)])
+
+
+def test_unknown_plateau_cuts_before_cache():
+    class CachedEverything:
+        def key(self, *args, **kwargs):
+            return "key"
+
+        def get(self, key):
+            raise AssertionError("The plateau cuts should be checked first.")
+
+    multi = MultiTrigger(
+        [ElePt_WPTight_Gsf(fileset, 30), ElePt_WPTight_Gsf(fileset, 32)]
+    )
+    with pytest.raises(ValueError, match="unknown triggers"):
+        multi.get_tnp_histograms(
+            plateau_cuts={"HLT_Ele99_typo": 35}, compute=True, cache=CachedEverything()
+        )
+
+
+def test_threshold_scan():
+    multi = MultiTrigger.threshold_scan(
+        ElePt_WPTight_Gsf, fileset, [30, 32, 35], avoid_ecal_transition_probes=True
+    )
+    assert [trigger.name for trigger in multi.triggers] == [
+        "HLT_Ele30_WPTight_Gsf",
+        "HLT_Ele32_WPTight_Gsf",
+        "HLT_Ele35_WPTight_Gsf",
+    ]
+
+    histograms = multi.get_tnp_histograms(compute=True)["sample"]
+    for trigger in multi.triggers:
+        expected = trigger.get_tnp_histograms(compute=True)["sample"]
+        assert_same_histograms(histograms[trigger.name], expected)
+
+    with pytest.raises(ValueError):
+        MultiTrigger.threshold_scan(ElePt_WPTight_Gsf, fileset, [])
+    with pytest.raises(ValueError):
+        MultiTrigger.threshold_scan(DoubleElePt_CaloIdL_MW, fileset, [33])
+
+
+def test_unmatched_filters():
+    from coffea.nanoevents import NanoAODSchema, NanoEventsFactory
+
+    events = NanoEventsFactory.from_root(
+        fileset["sample"]["files"], schemaclass=NanoAODSchema, delayed=False
+    ).events()
+    perform_tnp = ElePt_WPTight_Gsf(fileset, 32)._make_tnpimpl()
+    good_events, zcands = perform_tnp.find_zcands(events)
+    legs = [(32, 1)]
+    probe_filters = perform_tnp.trigger_filters(legs)[1:]
+    zcands = perform_tnp.match_trigger_filters(good_events, zcands, probe_filters)
+
+    with pytest.raises(ValueError, match=r"trigger filter \(1, 30\)"):
+        perform_tnp.find_all_probes_on_legs(
+            good_events, zcands, legs, matched_filters=probe_filters
+        )
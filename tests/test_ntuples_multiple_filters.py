@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+from helpers import assert_same_histograms
+
+from egamma_tnp.triggers import TagNProbeFromNTuples
+from egamma_tnp.utils import PassFailHistograms
+
+fileset = {
+    "sample": {
+        "files": {os.path.abspath("tests/samples/TnPNTuples.root"): "fitter_tree"}
+    }
+}
+filters = [
+    "passHltEle32WPTightGsf",
+    "passHltEle115CaloIdVTGsfTrkIdTGsf",
+    "passHltEle23Ele12CaloIdLTrackIdLIsoVLLeg2",
+]
+
+
+@pytest.mark.parametrize("pass_fail_axis", [False, True])
+def test_same_as_single_filters(pass_fail_axis):
+    tag_n_probe = TagNProbeFromNTuples(
+        fileset, filters, trigger_pt={"passHltEle32WPTightGsf": 5}
+    )
+    assert tag_n_probe.trigger_pts == {
+        "passHltEle32WPTightGsf": 5,
+        "passHltEle115CaloIdVTGsfTrkIdTGsf": 112,
+        "passHltEle23Ele12CaloIdLTrackIdLIsoVLLeg2": 9,
+    }
+    plateau_cuts = {"passHltEle32WPTightGsf": 35}
+    histograms = tag_n_probe.get_tnp_histograms(
+        plateau_cut=plateau_cuts, pass_fail_axis=pass_fail_axis, compute=True
+    )["sample"]
+    assert list(histograms) == filters
+
+    for filter in filters:
+        expected = TagNProbeFromNTuples(
+            fileset, filter, trigger_pt=tag_n_probe.trigger_pts[filter]
+        ).get_tnp_histograms(plateau_cut=plateau_cuts.get(filter), compute=True)[
+            "sample"
+        ]
+        if pass_fail_axis:
+            assert_same_histograms(PassFailHistograms(histograms[filter]), expected)
+        else:
+            assert_same_histograms(histograms[filter], expected)
+
+
+def test_arrays():
+    arrays = TagNProbeFromNTuples(fileset, filters).get_tnp_arrays(compute=True)[
+        "sample"
+    ]
+    for filter in filters:
+        passing_probes, all_probes = arrays[filter]
+        expected_passing, expected_all = TagNProbeFromNTuples(
+            fileset, filter
+        ).get_tnp_arrays(compute=True)["sample"]
+        assert np.all(passing_probes.pt == expected_passing.pt)
+        assert np.all(all_probes.pt == expected_all.pt)
+
+
+def test_unknown_filters():
+    with pytest.raises(ValueError):
+        TagNProbeFromNTuples(fileset, filters, trigger_pt={"passHltEle30": 27})
+    with pytest.raises(ValueError):
+        TagNProbeFromNTuples(fileset, filters).get_tnp_histograms(
+            plateau_cut={"passHltEle30": 35}
+        )
+    with pytest.raises(ValueError):
+        TagNProbeFromNTuples(fileset, [])
+    with pytest.raises(ValueError, match="more than once"):
+        TagNProbeFromNTuples(fileset, [*filters, filters[0]])
+
+
+def test_unknown_plateau_cuts_before_cache():
+    class CachedEverything:
+        def key(self, *args, **kwargs):
+            return "key"
+
+        def get(self, key):
+            raise AssertionError("The plateau cuts should be checked first.")
+
+    with pytest.raises(ValueError, match="unknown filters"):
+        TagNProbeFromNTuples(fileset, filters).get_tnp_histograms(
+            plateau_cut={"passHltEle30": 35}, compute=True, cache=CachedEverything()
+        )
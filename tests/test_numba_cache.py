@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from egamma_tnp.utils import NumbaWarmUp
+
+kernels = (
+    "delta_phi",
+    "delta_r",
+    "_trigger_match_bits_kernel",
+)
+
+
+def warm_up(cache_dir):
+    # a fresh interpreter like a new worker, that reports how many kernel signatures were loaded from the cache
+    code = (
+        "from egamma_tnp.utils import warm_up_numba_kernels; "
+        f"warm_up_numba_kernels({str(cache_dir)!r}); "
+        "from egamma_tnp.utils import misc; "
+        "print(sum(misc._trigger_match_bits_kernel.stats.cache_hits.values()))"
+    )
+    return subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+
+def test_on_disk_cache(tmp_path):
+    assert warm_up(tmp_path).split() == ["0"]
+    index_files = [path.name for path in tmp_path.rglob("*.nbi")]
+    for kernel in kernels:
+        assert any(name.startswith(f"misc.{kernel}-") for name in index_files)
+    assert warm_up(tmp_path).split() == ["1"]
+
+
+def test_worker_plugin(tmp_path, monkeypatch):
+    import numba
+
+    from egamma_tnp.utils import misc  # noqa: F401
+
+    cache_dir = numba.config.CACHE_DIR
+    # record the environment variable so that it is restored after the test
+    monkeypatch.setenv("NUMBA_CACHE_DIR", str(tmp_path))
+    # the kernels are already decorated with their cache directory in this process
+    with pytest.warns(UserWarning, match="already been imported"):
+        NumbaWarmUp(str(tmp_path / "workers")).setup(worker=None)
+    assert numba.config.CACHE_DIR == cache_dir
+    assert os.environ["NUMBA_CACHE_DIR"] == str(tmp_path / "workers")
@@ -0,0 +1,167 @@
+import os
+
+import numpy as np
+import pytest
+from helpers import assert_same_histograms
+
+from egamma_tnp.triggers import (
+    DoubleElePt_CaloIdL_MW,
+    ElePt_WPTight_Gsf,
+    MultiTrigger,
+    TagNProbeFromNTuples,
+)
+from egamma_tnp.utils import PassFailHistograms
+
+fileset = {
+    "sample": {"files": {os.path.abspath("tests/samples/DYto2E.root"): "Events"}}
+}
+fileset_ntuples = {
+    "sample": {
+        "files": {os.path.abspath("tests/samples/TnPNTuples.root"): "fitter_tree"}
+    }
+}
+eta_regions_eta = {"barrel": [0.0, 1.4442], "endcap": [1.566, 2.5]}
+
+
+def test_single_electron_trigger():
+    tag_n_probe = ElePt_WPTight_Gsf(fileset, 32, avoid_ecal_transition_probes=True)
+    kwargs = {"plateau_cut": 35, "eta_regions_eta": eta_regions_eta, "compute": True}
+
+    histograms = tag_n_probe.get_tnp_histograms(pass_fail_axis=True, **kwargs)
+    expected = tag_n_probe.get_tnp_histograms(**kwargs)
+    assert set(histograms["sample"]["pt"].axes.name) == {"pt", "region", "passing"}
+    view = PassFailHistograms(histograms["sample"])
+    assert_same_histograms(view, expected["sample"])
+    assert (
+        view["pt"]["barrel"]["all"].sum(flow=True)
+        + view["pt"]["endcap"]["all"].sum(flow=True)
+        == 1153.0
+    )
+    assert (
+        view["pt"]["barrel"]["passing"].sum(flow=True)
+        + view["pt"]["endcap"]["passing"].sum(flow=True)
+        == 954.0
+    )
+
+
+def test_double_electron_trigger():
+    tag_n_probe = DoubleElePt_CaloIdL_MW(fileset, 33)
+    kwargs = {"plateau_cut1": 35, "plateau_cut2": 35, "compute": True}
+
+    histograms = tag_n_probe.get_tnp_histograms(pass_fail_axis=True, **kwargs)
+    expected = tag_n_probe.get_tnp_histograms(**kwargs)
+    for leg in ["leg1", "leg2"]:
+        assert_same_histograms(
+            PassFailHistograms(histograms["sample"][leg]), expected["sample"][leg]
+        )
+
+
+def test_multi_trigger():
+    multi = MultiTrigger(
+        [ElePt_WPTight_Gsf(fileset, 32), DoubleElePt_CaloIdL_MW(fileset, 33)]
+    )
+
+    histograms = multi.get_tnp_histograms(pass_fail_axis=True, compute=True)
+    expected = multi.get_tnp_histograms(compute=True)
+    assert_same_histograms(
+        PassFailHistograms(histograms["sample"]["HLT_Ele32_WPTight_Gsf"]),
+        expected["sample"]["HLT_Ele32_WPTight_Gsf"],
+    )
+    for leg in ["leg1", "leg2"]:
+        assert_same_histograms(
+            PassFailHistograms(histograms["sample"]["HLT_DoubleEle33_CaloIdL_MW"][leg]),
+            expected["sample"]["HLT_DoubleEle33_CaloIdL_MW"][leg],
+        )
+
+
+def test_ntuples():
+    tag_n_probe = TagNProbeFromNTuples(fileset_ntuples, "passHltEle30WPTightGsf")
+    kwargs = {"plateau_cut": 35, "eta_regions_eta": eta_regions_eta, "compute": True}
+
+    histograms = tag_n_probe.get_tnp_histograms(pass_fail_axis=True, **kwargs)
+    expected = tag_n_probe.get_tnp_histograms(**kwargs)
+    assert_same_histograms(PassFailHistograms(histograms["sample"]), expected["sample"])
+
+
+def test_fine_and_overlapping_eta_regions():
+    tag_n_probe = ElePt_WPTight_Gsf(fileset, 32)
+    edges = np.linspace(0.0, 2.5, 11)
+    kwargs = {
+        "eta_regions_pt": {
+            f"{lo:.2f}_{hi:.2f}": [lo, hi] for lo, hi in zip(edges[:-1], edges[1:])
+        },
+        "eta_regions_eta": {"entire": [0.0, 2.5], "barrel": [0.0, 1.4442]},
+        "compute": True,
+    }
+
+    histograms = tag_n_probe.get_tnp_histograms(pass_fail_axis=True, **kwargs)
+    expected = tag_n_probe.get_tnp_histograms(**kwargs)
+    assert_same_histograms(PassFailHistograms(histograms["sample"]), expected["sample"])
+
+
+def test_eager_fill():
+    import awkward as ak
+
+    from egamma_tnp.utils import fill_pass_fail_histograms, fill_tnp_histograms
+
+    rng = np.random.default_rng(42)
+    size = 10_000
+    # include probes exactly on the region boundaries which belong to no region
+    eta = np.concatenate(
+        [rng.uniform(-3.0, 3.0, size), [0.0, 1.4442, -1.566, 2.5, -2.5]]
+    )
+    probes = ak.zip(
+        {
+            "pt": rng.uniform(5.0, 200.0, len(eta)),
+            "eta": eta,
+            "phi": rng.uniform(-np.pi, np.pi, len(eta)),
+            "passing": rng.uniform(0.0, 1.0, len(eta)) > 0.3,
+        }
+    )
+    eta_regions_eta = {"endcap": [1.566, 2.5], "barrel": [0.0, 1.4442]}
+
+    histograms = fill_pass_fail_histograms(
+        probes, plateau_cut=35, eta_regions_eta=eta_regions_eta, delayed=False
+    )
+    expected = fill_tnp_histograms(
+        probes[probes.passing],
+        probes,
+        plateau_cut=35,
+        eta_regions_eta=eta_regions_eta,
+        delayed=False,
+    )
+    assert_same_histograms(PassFailHistograms(histograms), expected)
+
+
+def test_supercluster_eta():
+    from egamma_tnp.utils import fill_tnp_histograms
+
+    tag_n_probe = ElePt_WPTight_Gsf(fileset, 32)
+    passing_probes, all_probes = tag_n_probe.get_tnp_arrays(compute=True)["sample"]
+    assert not np.all(all_probes.etaSC == all_probes.eta)
+
+    kwargs = {"plateau_cut": 35, "eta_regions_eta": eta_regions_eta}
+    expected = fill_tnp_histograms(
+        passing_probes, all_probes, eta_variable="etaSC", delayed=False, **kwargs
+    )
+    histograms = tag_n_probe.get_tnp_histograms(
+        eta_variable="etaSC", compute=True, **kwargs
+    )["sample"]
+    assert_same_histograms(histograms, expected)
+    histograms = tag_n_probe.get_tnp_histograms(
+        eta_variable="etaSC", pass_fail_axis=True, compute=True, **kwargs
+    )["sample"]
+    assert_same_histograms(PassFailHistograms(histograms), expected)
+
+
+def test_invalid_eta_variable():
+    from egamma_tnp.utils import fill_pass_fail_histograms, fill_tnp_histograms
+
+    tag_n_probe = ElePt_WPTight_Gsf(fileset, 32)
+    passing_probes, all_probes = tag_n_probe.get_tnp_arrays()["sample"]
+    with pytest.raises(ValueError, match="eta_variable"):
+        fill_tnp_histograms(passing_probes, all_probes, eta_variable="phi")
+    with pytest.raises(ValueError, match="eta_variable"):
+        fill_pass_fail_histograms(all_probes, eta_variable="sc_eta")
+    with pytest.raises(ValueError, match="eta_variable"):
+        tag_n_probe.get_tnp_histograms(eta_variable="eta_sc", executor="eager")
@@ -0,0 +1,100 @@
+import os
+
+import awkward as ak
+import numpy as np
+import pytest
+import uproot
+from coffea.dataset_tools import preprocess
+
+from egamma_tnp.triggers import ElePt_WPTight_Gsf
+from egamma_tnp.utils import prefilter_fileset, scan_run_lumi_ranges
+
+electron_fields = ["pt", "eta", "phi", "mass", "charge", "cutBased", "deltaEtaSC"]
+trigobj_fields = ["pt", "eta", "phi", "id", "filterBits"]
+flat_branches = [
+    "HLT_Ele30_WPTight_Gsf",
+    "HLT_Ele32_WPTight_Gsf",
+    "run",
+    "luminosityBlock",
+    "event",
+]
+
+
+@pytest.fixture(scope="module")
+def fileset(tmp_path_factory):
+    events = uproot.open(os.path.abspath("tests/samples/DYto2E.root"))["Events"]
+    arrays = events.arrays(
+        [f"Electron_{field}" for field in electron_fields]
+        + [f"TrigObj_{field}" for field in trigobj_fields]
+        + flat_branches
+    )
+    data = {
+        "Electron": ak.zip(
+            {field: arrays[f"Electron_{field}"] for field in electron_fields}
+        ),
+        "TrigObj": ak.zip(
+            {field: arrays[f"TrigObj_{field}"] for field in trigobj_fields}
+        ),
+    }
+    data.update({branch: arrays[branch] for branch in flat_branches})
+    # no event of the baskets from entry 300 to 600 passes the tag selection
+    hlt = ak.to_numpy(arrays.HLT_Ele30_WPTight_Gsf).copy()
+    hlt[300:600] = False
+    data["HLT_Ele30_WPTight_Gsf"] = ak.Array(hlt)
+
+    path = str(tmp_path_factory.mktemp("prefilter") / "baskets.root")
+    with uproot.recreate(path) as f:
+        f.mktree(
+            "Events",
+            {name: array.type for name, array in data.items()},
+            counter_name=lambda name: f"n{name}",
+            field_name=lambda outer, inner: f"{outer}_{inner}",
+        )
+        # one basket every 100 entries
+        for start in range(0, 1000, 100):
+            f["Events"].extend(
+                {name: array[start : start + 100] for name, array in data.items()}
+            )
+
+    preprocessed, _ = preprocess(
+        {"sample": {"files": {path: "Events"}}}, step_size=500, skip_bad_files=False
+    )
+    return preprocessed
+
+
+def test_prefilter_fileset(fileset):
+    (path,) = fileset["sample"]["files"]
+    assert fileset["sample"]["files"][path]["steps"] == [[0, 500], [500, 1000]]
+
+    prefiltered = prefilter_fileset(fileset, scheduler="sync")
+    assert prefiltered["sample"]["files"][path]["steps"] == [[0, 300], [600, 1000]]
+
+    scanned = scan_run_lumi_ranges(fileset, scheduler="sync")
+    ranges = scanned["sample"]["files"][path]["run_lumi_ranges"]
+    prefiltered = prefilter_fileset(scanned, scheduler="sync")
+    assert prefiltered["sample"]["files"][path]["run_lumi_ranges"] == ranges
+
+
+def test_same_probes(fileset):
+    prefiltered = prefilter_fileset(fileset, scheduler="sync")
+    expected_pass, expected_all = ElePt_WPTight_Gsf(fileset, 32).get_tnp_arrays(
+        compute=True
+    )["sample"]
+    passing_probes, all_probes = ElePt_WPTight_Gsf(prefiltered, 32).get_tnp_arrays(
+        compute=True
+    )["sample"]
+    assert len(all_probes) > 0
+    for field in ["pt", "eta", "phi"]:
+        assert np.all(passing_probes[field] == expected_pass[field])
+        assert np.all(all_probes[field] == expected_all[field])
+
+
+def test_not_preprocessed():
+    with pytest.raises(ValueError):
+        prefilter_fileset(
+            {
+                "sample": {
+                    "files": {os.path.abspath("tests/samples/DYto2E.root"): "Events"}
+                }
+            }
+        )
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+from helpers import assert_same_histograms
+
+from egamma_tnp.triggers import DoubleElePt_CaloIdL_MW, ElePt_WPTight_Gsf, MultiTrigger
+from egamma_tnp.utils import (
+    PassFailHistograms,
+    get_tnp_histograms_from_skim,
+    read_tnp_skim,
+)
+
+fileset = {
+    "sample": {"files": {os.path.abspath("tests/samples/DYto2E.root"): "Events"}}
+}
+
+
+def test_single_electron_skim(tmp_path):
+    tag_n_probe = ElePt_WPTight_Gsf(fileset, 32)
+    assert tag_n_probe.write_tnp_skim(str(tmp_path)) is None
+
+    path = str(tmp_path / "sample" / "HLT_Ele32_WPTight_Gsf")
+    probes = read_tnp_skim(path)
+    assert set(probes.fields) == {
+        "pt",
+        "eta",
+        "phi",
+        "etaSC",
+        "mass",
+        "run",
+        "luminosityBlock",
+        "event",
+        "passing",
+    }
+    passing_probes, all_probes = tag_n_probe.get_tnp_arrays(compute=True)["sample"]
+    assert np.all(probes.pt == all_probes.pt)
+    assert np.all(probes.etaSC == all_probes.etaSC)
+    assert np.all(probes[probes.passing].pt == passing_probes.pt)
+    assert np.all(abs(probes.mass - 91.1876) < 30)
+
+    histograms = get_tnp_histograms_from_skim(path, plateau_cut=35)
+    expected = tag_n_probe.get_tnp_histograms(plateau_cut=35, compute=True)["sample"]
+    assert_same_histograms(histograms, expected)
+
+    histograms = get_tnp_histograms_from_skim(
+        path, plateau_cut=35, eta_variable="etaSC"
+    )
+    expected = tag_n_probe.get_tnp_histograms(
+        plateau_cut=35, eta_variable="etaSC", compute=True
+    )["sample"]
+    assert_same_histograms(histograms, expected)
+
+    histograms = get_tnp_histograms_from_skim(path, pass_fail_axis=True)
+    assert_same_histograms(
+        PassFailHistograms(histograms),
+        tag_n_probe.get_tnp_histograms(compute=True)["sample"],
+    )
+
+    filtered = read_tnp_skim(path, filters=[("pt", ">", 35)])
+    assert len(filtered) == np.sum(probes.pt > 35)
+
+
+def test_multi_trigger_skim(tmp_path):
+    triggers = [
+        ElePt_WPTight_Gsf(fileset, 32),
+        DoubleElePt_CaloIdL_MW(fileset, 33),
+    ]
+    MultiTrigger(triggers).write_tnp_skim(str(tmp_path))
+
+    histograms = get_tnp_histograms_from_skim(
+        str(tmp_path / "sample" / "HLT_Ele32_WPTight_Gsf")
+    )
+    expected = triggers[0].get_tnp_histograms(compute=True)["sample"]
+    assert_same_histograms(histograms, expected)
+
+    expected = triggers[1].get_tnp_histograms(compute=True)["sample"]
+    for leg in ["leg1", "leg2"]:
+        histograms = get_tnp_histograms_from_skim(
+            str(tmp_path / "sample" / "HLT_DoubleEle33_CaloIdL_MW" / leg)
+        )
+        assert_same_histograms(histograms, expected[leg])
+
+
+def test_missing_skim(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_tnp_skim(str(tmp_path / "missing"))
@@ -0,0 +1,86 @@
+import os
+
+import awkward as ak
+import dask_awkward as dak
+import numpy as np
+import pytest
+from coffea.nanoevents import NanoAODSchema, NanoEventsFactory
+
+from egamma_tnp.utils import delta_r_SC, trigger_match_bits_SC
+
+
+@pytest.fixture(scope="module")
+def events():
+    return NanoEventsFactory.from_root(
+        {os.path.abspath("tests/samples/DYto2E.root"): "Events"},
+        schemaclass=NanoAODSchema,
+        delayed=True,
+    ).events()
+
+
+def metric_table_match(electrons, trigobjs, dr):
+    return (
+        dak.sum(electrons.metric_table(trigobjs, metric=delta_r_SC) < dr, axis=2) >= 1
+    )
+
+
+@pytest.mark.parametrize("dr", [0.1, 0.3])
+def test_same_as_metric_table(events, dr):
+    electrons = events.Electron
+    trigobjs = events.TrigObj[abs(events.TrigObj.id) == 11]
+    passing = trigobjs[trigobjs.filterBits & (1 << 1) != 0]
+
+    expected = metric_table_match(electrons, passing, dr)
+    matched = trigger_match_bits_SC(electrons, trigobjs, [(1, -1)], dr=dr) & 1 == 1
+
+    expected, matched = expected.compute(), matched.compute()
+    assert ak.any(matched)
+    assert ak.all(ak.num(matched) == ak.num(expected))
+    assert ak.all(matched == expected)
+
+
+def test_eager_and_empty():
+    electrons = ak.Array(
+        [
+            [{"eta": 0.5, "deltaEtaSC": 0.01, "phi": 1.0}],
+            [],
+            [
+                {"eta": -1.0, "deltaEtaSC": 0.0, "phi": -3.1},
+                {"eta": 2.0, "deltaEtaSC": 0.0, "phi": 0.0},
+            ],
+        ]
+    )
+    trigobjs = ak.Array(
+        [
+            [],
+            [{"eta": 0.0, "phi": 0.0, "pt": 40.0, "filterBits": 2}],
+            [{"eta": -1.0, "phi": 3.1, "pt": 40.0, "filterBits": 2}],
+        ]
+    )
+    matched_bits = trigger_match_bits_SC(electrons, trigobjs, [(1, 30), (1, 50)])
+    # the first electron of the last event is only close to the trigger object across the -pi/pi boundary
+    assert matched_bits.tolist() == [[0], [], [1, 0]]
+    assert np.all(ak.num(matched_bits) == ak.num(electrons))
+
+
+def test_matched_bits(events):
+    electrons = events.Electron
+    trigobjs = events.TrigObj[abs(events.TrigObj.id) == 11]
+    filters = [(1, 30), (1, 0), (12, 0), (1, 1000)]
+
+    matched_bits = trigger_match_bits_SC(electrons, trigobjs, filters).compute()
+    assert ak.all(ak.num(matched_bits) == ak.num(electrons.compute()))
+    for i, (filterbit, pt) in enumerate(filters):
+        passing = trigobjs[
+            (trigobjs.filterBits & (1 << filterbit) != 0) & (trigobjs.pt > pt)
+        ]
+        expected = metric_table_match(electrons, passing, 0.1).compute()
+        assert ak.all(((matched_bits >> i) & 1 == 1) == expected)
+    assert ak.any((matched_bits >> 0) & 1 == 1)
+    assert not ak.any((matched_bits >> 3) & 1 == 1)
+
+
+@pytest.mark.parametrize("nfilters", [0, 65])
+def test_matched_bits_number_of_filters(events, nfilters):
+    with pytest.raises(ValueError):
+        trigger_match_bits_SC(events.Electron, events.TrigObj, [(1, 0)] * nfilters)